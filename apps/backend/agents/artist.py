@@ -2,25 +2,206 @@
 Artist Agent - Image generation using OpenAI gpt-image-1 with IPFS integration
 """
 import os
+import math
+import logging
 import time
-import uuid
-import base64
+import hashlib
 import pathlib
 import asyncio
-from typing import Dict, Any, List, Optional
-from openai import OpenAI
-from PIL import Image
+import threading
+import functools
+from collections import OrderedDict
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from openai import AsyncOpenAI
+from PIL import Image, ImageDraw, ImageFont
 from io import BytesIO
 from state import RunState, ArtSet
+from messages import agent_message, numbered_links, stream_progress
 from services.mcp_client import get_mcp_client
+import simple_state
 import requests
 
+try:
+    # SIMD-accelerated decoder for the multi-MB gpt-image-1 payloads
+    import pybase64 as base64
+except ImportError:
+    import base64
 
-def write_b64_image(path: pathlib.Path, b64: str) -> None:
-    """Write base64 image data to file."""
+try:
+    # libvips shrinks on load in one streaming pass; needs the system library as well as the binding
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
+
+logger = logging.getLogger(__name__)
+
+
+# Messages from this agent: _msg(level, message, **extra)
+_msg = functools.partial(agent_message, "Artist")
+
+
+# Thumbnail JPEG quality bounds; the size budget decides where in between each image lands
+THUMBNAIL_QUALITY = 85
+THUMBNAIL_MIN_QUALITY = 25
+
+# Phrasing rotated across prompt variations
+_VARIATION_WORDS = ("featuring", "with", "incorporating", "showcasing")
+_AVOID_WORDS = ("avoid", "not", "without", "no")
+
+
+# gpt-image-1 output size unless ARTIST_IMAGE_SIZE asks for a high-res variant such as 1536x1024
+DEFAULT_IMAGE_SIZE = "1024x1024"
+
+# Upper bound on concurrent gpt-image-1 requests per artist run
+MAX_IMAGE_WORKERS = 4
+
+# Placeholder ArtSet used when the whole generation step fails
+_FALLBACK_CIDS = tuple(f"ipfs://fallback_placeholder_{i}" for i in range(1, 5))
+_FALLBACK_THUMBNAILS = tuple(f"ipfs://fallback_thumb_{i}" for i in range(1, 5))
+_FALLBACK_STYLE_NOTE = "Image generation failed - using fallback placeholder"
+_FALLBACK_STYLE_NOTES = (_FALLBACK_STYLE_NOTE,) * 4
+_FALLBACK_ART_SET = {"cids": _FALLBACK_CIDS, "thumbnails": _FALLBACK_THUMBNAILS, "style_notes": _FALLBACK_STYLE_NOTES}
+
+# Shared async OpenAI client so concurrent image requests multiplex one connection pool
+# on the event loop instead of parking a thread per request
+_openai_client: Optional[AsyncOpenAI] = None
+
+
+def _get_openai_client() -> AsyncOpenAI:
+    """Get the shared async OpenAI client, creating it on first use."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"), timeout=180.0)
+    return _openai_client
+
+
+# Completed ArtSets keyed by their exact prompts, so replays of the same seed skip generation entirely
+ART_SET_CACHE_SIZE = 64
+_art_set_cache: "OrderedDict[Tuple[str, ...], Dict[str, Any]]" = OrderedDict()
+_art_set_cache_lock = threading.Lock()
+
+
+# Near-duplicate seeds (synonyms, reordered motifs) reuse an ArtSet by embedding similarity; opt in
+# with ARTIST_SEMANTIC_CACHE=true since every cache miss then costs an extra embeddings call
+SEMANTIC_CACHE_MODEL = "text-embedding-3-small"
+DEFAULT_SEMANTIC_CACHE_THRESHOLD = 0.92
+
+
+def _semantic_cache_threshold() -> float:
+    """Read ARTIST_SEMANTIC_CACHE_THRESHOLD, falling back to the default on a malformed value."""
+    raw = os.getenv("ARTIST_SEMANTIC_CACHE_THRESHOLD")
+    if raw is None:
+        return DEFAULT_SEMANTIC_CACHE_THRESHOLD
+    try:
+        return float(raw)
+    except ValueError:
+        logger.warning("Invalid ARTIST_SEMANTIC_CACHE_THRESHOLD %r, using %s", raw, DEFAULT_SEMANTIC_CACHE_THRESHOLD)
+        return DEFAULT_SEMANTIC_CACHE_THRESHOLD
+
+
+SEMANTIC_CACHE_THRESHOLD = _semantic_cache_threshold()
+_semantic_cache: "OrderedDict[str, Tuple[Tuple[float, ...], Dict[str, Any]]]" = OrderedDict()
+
+
+PINATA_PIN_FILE_URL = "https://api.pinata.cloud/pinning/pinFileToIPFS"
+
+# (image, thumbnail) paths already pinned by this process keyed by a SHA-256 of the uploaded bytes,
+# so retries and repeated runs that produce identical artworks skip the upload entirely
+PIN_CACHE_SIZE = 256
+_pin_cache: "OrderedDict[bytes, Tuple[str, str]]" = OrderedDict()
+_pin_cache_lock = threading.Lock()
+
+# Pinata sessions, one per worker thread since requests.Session isn't documented as thread-safe;
+# each thread's pins still reuse its kept-alive TLS connection across images and runs
+_pinata_local = threading.local()
+
+
+def _get_pinata_session() -> requests.Session:
+    """Get this thread's Pinata session, creating it on first use."""
+    session = getattr(_pinata_local, "session", None)
+    if session is None:
+        session = _pinata_local.session = requests.Session()
+    return session
+
+
+def _pinata_headers(pinata_jwt: str) -> Dict[str, str]:
+    """Authorization header for one Pinata request."""
+    return {"Authorization": f"Bearer {pinata_jwt}"}
+
+
+def _pin_key(*parts: bytes) -> bytes:
+    """Digest of the bytes to be pinned; each part is length-prefixed so boundaries count."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.digest()
+
+
+def _get_cached_pin(key: bytes) -> Optional[Tuple[str, str]]:
+    """Get the paths previously pinned for this content, or None."""
+    with _pin_cache_lock:
+        paths = _pin_cache.get(key)
+        if paths is not None:
+            _pin_cache.move_to_end(key)
+        return paths
+
+
+def _remember_pin(key: bytes, paths: Tuple[str, str]) -> None:
+    """Remember the paths pinned for this content, evicting the least recently used entry."""
+    with _pin_cache_lock:
+        _pin_cache[key] = paths
+        _pin_cache.move_to_end(key)
+        while len(_pin_cache) > PIN_CACHE_SIZE:
+            _pin_cache.popitem(last=False)
+
+
+def target_image_size() -> str:
+    """
+    Get the gpt-image-1 output size.
+    
+    Defaults to 1024x1024: thumbnails and IPFS copies are all smaller than that, and
+    the 1.5x fewer pixels than 1536x1024 usually keeps the PNG under the 2MB pin limit.
+    """
+    return os.getenv("ARTIST_IMAGE_SIZE", DEFAULT_IMAGE_SIZE)
+
+
+def save_images_enabled() -> bool:
+    """Check whether generated images should also be written under temp_images/ for debugging."""
+    return os.getenv("ARTIST_SAVE_IMAGES", "false").lower() == "true"
+
+
+def save_image_bytes(data: bytes, filename: str) -> None:
+    """Write image bytes to file, creating parent directories."""
+    path = pathlib.Path(filename)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, 'wb') as f:
-        f.write(base64.b64decode(b64))
+    path.write_bytes(data)
+
+
+def _open_image(image_path: pathlib.Path, raw_bytes: Optional[bytes], image: Optional[Image.Image] = None):
+    """Context manager over an already decoded image, in-memory bytes, or the file on disk."""
+    if image is not None:
+        # Borrowed from the caller, so leave it open on exit
+        return nullcontext(image)
+    return Image.open(BytesIO(raw_bytes) if raw_bytes is not None else image_path)
+
+
+@dataclass
+class ArtifactInMemory:
+    """A generated image kept in memory, decoded at most once for thumbnailing and compression."""
+    png_bytes: bytes
+    size_mb: float = field(init=False)
+    
+    def __post_init__(self):
+        self.size_mb = len(self.png_bytes) / (1024 * 1024)
+    
+    @functools.cached_property
+    def pil_image(self) -> Image.Image:
+        """Decoded RGB pixels, shared by every step that needs them."""
+        with Image.open(BytesIO(self.png_bytes)) as img:
+            return img.convert('RGB')
 
 
 def validate_image_size(filepath: pathlib.Path, max_size_mb: float = 2.0) -> bool:
@@ -31,68 +212,148 @@ def validate_image_size(filepath: pathlib.Path, max_size_mb: float = 2.0) -> boo
     return size_mb <= max_size_mb
 
 
-def create_thumbnail(image_path: pathlib.Path, max_size_kb: float = 200.0) -> Optional[bytes]:
+def create_thumbnail(
+    image_path: pathlib.Path,
+    max_size_kb: float = 200.0,
+    raw_bytes: Optional[bytes] = None,
+    image: Optional[Image.Image] = None
+) -> Optional[bytes]:
     """
     Create thumbnail from image file with size validation.
     
     Args:
         image_path: Path to source image
         max_size_kb: Maximum thumbnail size in KB
+        raw_bytes: Encoded source image already in memory, used instead of reading image_path
+        image: Already decoded source image; left unmodified
         
     Returns:
         Thumbnail bytes or None if creation fails
     """
+    if pyvips is not None:
+        try:
+            return _create_thumbnail_vips(image_path, max_size_kb, raw_bytes)
+        except pyvips.Error as e:
+            logger.warning("    ⚠️ libvips thumbnail failed for %s, falling back to PIL: %s", image_path, e)
+    
     try:
-        with Image.open(image_path) as img:
+        with _open_image(image_path, raw_bytes, image) as img:
             # Convert to RGB if necessary (for PNG with transparency, etc.)
             if img.mode != 'RGB':
                 img = img.convert('RGB')
+            elif img is image:
+                # thumbnail() resizes in place; keep the shared image intact
+                img = img.copy()
             
             # Start with reasonable thumbnail size
             thumbnail_size = (400, 400)
             img.thumbnail(thumbnail_size, Image.Resampling.LANCZOS)
             
-            # Try different quality settings to get under size limit
-            for quality in [85, 70, 55, 40, 25]:
-                buffer = BytesIO()
-                img.save(buffer, format='JPEG', quality=quality, optimize=True)
-                buffer_size_kb = len(buffer.getvalue()) / 1024
-                
-                if buffer_size_kb <= max_size_kb:
-                    return buffer.getvalue()
+            # Encode at full quality, then at most once more at the predicted quality
+            data = _encode_within_budget(lambda quality: _encode_jpeg_buffer(img, quality), max_size_kb)
+            if data:
+                return data
             
-            # If still too large, try smaller dimensions
+            # If still too large, try smaller dimensions, shrinking the (already private) thumbnail in place
             for size in [(300, 300), (200, 200), (150, 150)]:
-                img_copy = img.copy()
-                img_copy.thumbnail(size, Image.Resampling.LANCZOS)
-                buffer = BytesIO()
-                img_copy.save(buffer, format='JPEG', quality=40, optimize=True)
-                buffer_size_kb = len(buffer.getvalue()) / 1024
+                img.thumbnail(size, Image.Resampling.LANCZOS)
+                data = _encode_jpeg_buffer(img, 40)
                 
-                if buffer_size_kb <= max_size_kb:
-                    return buffer.getvalue()
+                if len(data) / 1024 <= max_size_kb:
+                    return bytes(data)
                     
-            print(f"    ⚠️ Could not create thumbnail under {max_size_kb}KB for {image_path}")
+            logger.warning("    ⚠️ Could not create thumbnail under %sKB for %s", max_size_kb, image_path)
             return None
             
     except Exception as e:
-        print(f"    ⚠️ Thumbnail creation failed for {image_path}: {e}")
+        logger.warning("    ⚠️ Thumbnail creation failed for %s: %s", image_path, e)
         return None
 
 
-def compress_image_for_ipfs(image_path: pathlib.Path, max_size_mb: float = 2.0) -> Optional[bytes]:
+def _try_encode(img: Image.Image, **kw) -> Tuple[int, BytesIO]:
+    """Encode img as JPEG and return its size and buffer, without copying the bytes out."""
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', **kw)
+    return buffer.tell(), buffer
+
+
+def _encode_jpeg_buffer(img: Image.Image, quality: int) -> memoryview:
+    """Encode an RGB image as an optimized progressive 4:2:0 JPEG, as a zero-copy view."""
+    return _try_encode(img, quality=quality, optimize=True, progressive=True, subsampling=2)[1].getbuffer()
+
+
+def _encode_jpeg(img: Image.Image, quality: int) -> bytes:
+    """Encode an RGB image as an optimized progressive 4:2:0 JPEG."""
+    return bytes(_encode_jpeg_buffer(img, quality))
+
+
+def _encode_within_budget(encode: Callable[[int], Any], max_size_kb: float) -> Optional[bytes]:
+    """
+    Encode at THUMBNAIL_QUALITY and, if that is over budget, once more at the quality
+    the size/quality curve predicts will fit, instead of walking a fixed quality ladder.
+    
+    encode may return any buffer (bytes or a memoryview); only the result that fits
+    is copied out to bytes.
+    
+    Returns:
+        Encoded bytes under max_size_kb, or None if the predicted quality still misses
+    """
+    data = encode(THUMBNAIL_QUALITY)
+    size_kb = len(data) / 1024
+    if size_kb <= max_size_kb:
+        return bytes(data)
+    
+    quality = int(THUMBNAIL_QUALITY * (max_size_kb / size_kb) ** 0.7)
+    quality = max(THUMBNAIL_MIN_QUALITY, min(THUMBNAIL_QUALITY, quality))
+    data = encode(quality)
+    return bytes(data) if len(data) / 1024 <= max_size_kb else None
+
+
+def _create_thumbnail_vips(image_path: pathlib.Path, max_size_kb: float, raw_bytes: Optional[bytes] = None) -> Optional[bytes]:
+    """libvips version of create_thumbnail with the same size and quality strategy."""
+    for size in (400, 300, 200, 150):
+        if raw_bytes is not None:
+            img = pyvips.Image.thumbnail_buffer(raw_bytes, size, height=size)
+        else:
+            img = pyvips.Image.thumbnail(str(image_path), size, height=size)
+        if img.hasalpha():
+            img = img.flatten()
+        
+        def encode(quality: int) -> bytes:
+            return img.write_to_buffer(".jpg", Q=quality, optimize_coding=True, interlace=True, subsample_mode="on")
+        
+        if size == 400:
+            data = _encode_within_budget(encode, max_size_kb)
+        else:
+            data = encode(40)
+            data = data if len(data) / 1024 <= max_size_kb else None
+        if data:
+            return data
+    
+    logger.warning("    ⚠️ Could not create thumbnail under %sKB for %s", max_size_kb, image_path)
+    return None
+
+
+def compress_image_for_ipfs(
+    image_path: pathlib.Path,
+    max_size_mb: float = 2.0,
+    raw_bytes: Optional[bytes] = None,
+    image: Optional[Image.Image] = None
+) -> Optional[bytes]:
     """
     Compress image to meet IPFS size requirements.
     
     Args:
         image_path: Path to source image
         max_size_mb: Maximum size in MB
+        raw_bytes: Encoded source image already in memory, used instead of reading image_path
+        image: Already decoded source image; left unmodified
         
     Returns:
         Compressed image bytes or None if compression fails
     """
     try:
-        with Image.open(image_path) as img:
+        with _open_image(image_path, raw_bytes, image) as img:
             # Convert to RGB if necessary
             if img.mode != 'RGB':
                 img = img.convert('RGB')
@@ -102,43 +363,41 @@ def compress_image_for_ipfs(image_path: pathlib.Path, max_size_mb: float = 2.0)
             # Try different compression strategies
             strategies = [
                 # First try: reduce quality but keep size
-                {'format': 'JPEG', 'quality': 85, 'optimize': True},
-                {'format': 'JPEG', 'quality': 70, 'optimize': True},
-                {'format': 'JPEG', 'quality': 55, 'optimize': True},
+                {'format': 'JPEG', 'quality': 85},
+                {'format': 'JPEG', 'quality': 70},
+                {'format': 'JPEG', 'quality': 55},
                 
                 # Then try: resize image dimensions
-                {'format': 'JPEG', 'quality': 85, 'optimize': True, 'resize': (1200, 800)},
-                {'format': 'JPEG', 'quality': 70, 'optimize': True, 'resize': (1000, 667)},
-                {'format': 'JPEG', 'quality': 55, 'optimize': True, 'resize': (800, 533)},
+                {'format': 'JPEG', 'quality': 85, 'resize': (1200, 800)},
+                {'format': 'JPEG', 'quality': 70, 'resize': (1000, 667)},
+                {'format': 'JPEG', 'quality': 55, 'resize': (800, 533)},
             ]
             
+            # Quality-only strategies encode the source untouched; the resize strategies
+            # (largest first) keep shrinking one private copy in place
+            working = img
             for strategy in strategies:
-                img_copy = img.copy()
-                
                 # Apply resizing if specified
                 if 'resize' in strategy:
-                    img_copy.thumbnail(strategy['resize'], Image.Resampling.LANCZOS)
-                
-                buffer = BytesIO()
-                img_copy.save(
-                    buffer, 
-                    format=strategy['format'],
-                    quality=strategy['quality'],
-                    optimize=strategy.get('optimize', False)
-                )
+                    if working is img:
+                        working = img.copy()
+                    working.thumbnail(strategy['resize'], Image.Resampling.LANCZOS)
                 
-                compressed_data = buffer.getvalue()
-                size_mb = len(compressed_data) / (1024 * 1024)
+                # Trial encodes skip the Huffman optimization pass; they only measure size
+                size, _ = _try_encode(working, quality=strategy['quality'], subsampling=2)
                 
-                if len(compressed_data) <= max_size_bytes:
-                    print(f"    ✅ Compressed {image_path.name}: {size_mb:.2f}MB (quality={strategy['quality']})")
+                if size <= max_size_bytes:
+                    # Final encode of the winner, optimized and progressive (a few percent smaller)
+                    compressed_data = _encode_jpeg(working, strategy['quality'])
+                    size_mb = len(compressed_data) / (1024 * 1024)
+                    logger.debug("    ✅ Compressed %s: %.2fMB (quality=%s)", image_path.name, size_mb, strategy['quality'])
                     return compressed_data
             
-            print(f"    ⚠️ Could not compress {image_path.name} under {max_size_mb}MB")
+            logger.warning("    ⚠️ Could not compress %s under %sMB", image_path.name, max_size_mb)
             return None
             
     except Exception as e:
-        print(f"    ⚠️ Image compression failed for {image_path}: {e}")
+        logger.warning("    ⚠️ Image compression failed for %s: %s", image_path, e)
         return None
 
 
@@ -159,48 +418,47 @@ async def pin_image_to_ipfs_direct(image_path: pathlib.Path, run_id: str) -> Opt
         
         if size_mb <= 2.0:
             # Image is already under limit, use original file
-            print(f"    📎 Using original image ({size_mb:.2f}MB)")
+            logger.debug("    📎 Using original image (%.2fMB)", size_mb)
             file_data = None  # Will read from file directly
         else:
             # Image is too large, compress it
-            print(f"    🗜️ Compressing large image ({size_mb:.1f}MB > 2MB)")
+            logger.debug("    🗜️ Compressing large image (%.1fMB > 2MB)", size_mb)
             file_data = compress_image_for_ipfs(image_path, max_size_mb=2.0)
             if not file_data:
-                print(f"    ⚠️ Image compression failed: {image_path}")
+                logger.warning("    ⚠️ Image compression failed: %s", image_path)
                 return None
         
         # Pin directly to Pinata API (workaround for MCP server FormData issue)
         pinata_jwt = os.getenv("PINATA_JWT")
         if not pinata_jwt:
-            print(f"    ⚠️ PINATA_JWT not configured - falling back to MCP server")
+            logger.warning("    ⚠️ PINATA_JWT not configured - falling back to MCP server")
             return await pin_image_to_ipfs_mcp(image_path, run_id, file_data)
         
-        url = "https://api.pinata.cloud/pinning/pinFileToIPFS"
-        headers = {"Authorization": f"Bearer {pinata_jwt}"}
+        session = _get_pinata_session()
         
-        print(f"    📎 Pinning {image_path.name} directly to Pinata...")
+        logger.debug("    📎 Pinning %s directly to Pinata...", image_path.name)
         
         if file_data:
             # Use compressed data
             files = {"file": (image_path.name, BytesIO(file_data), "image/jpeg")}
-            print(f"    📦 Uploading compressed data ({len(file_data)/1024:.0f}KB)")
-            response = requests.post(url, files=files, headers=headers)
+            logger.debug("    📦 Uploading compressed data (%.0fKB)", len(file_data)/1024)
+            response = session.post(PINATA_PIN_FILE_URL, files=files, headers=_pinata_headers(pinata_jwt))
         else:
             # Use original file
             with open(image_path, 'rb') as f:
                 files = {"file": (image_path.name, f, "image/png")}
-                response = requests.post(url, files=files, headers=headers)
+                response = session.post(PINATA_PIN_FILE_URL, files=files, headers=_pinata_headers(pinata_jwt))
         
         if response.status_code != 200:
-            print(f"    ⚠️ Pinata API error {response.status_code}: {response.text}")
+            logger.warning("    ⚠️ Pinata API error %s: %s", response.status_code, response.text)
             return None
         
         ipfs_hash = response.json()['IpfsHash']
-        print(f"    ✅ Pinned directly to IPFS: ipfs://{ipfs_hash}")
+        logger.debug("    ✅ Pinned directly to IPFS: ipfs://%s", ipfs_hash)
         return ipfs_hash
         
     except Exception as e:
-        print(f"    ⚠️ Direct IPFS pinning failed for {image_path}: {e}")
+        logger.warning("    ⚠️ Direct IPFS pinning failed for %s: %s", image_path, e)
         # Fallback to MCP server attempt
         return await pin_image_to_ipfs_mcp(image_path, run_id, None)
 
@@ -226,14 +484,14 @@ async def pin_image_to_ipfs_mcp(image_path: pathlib.Path, run_id: str, compresse
         
         # Pin to IPFS via MCP
         mcp_client = get_mcp_client()
-        print(f"    📎 Pinning {image_path.name} to IPFS via MCP ({len(image_data)/1024:.0f}KB)...")
+        logger.debug("    📎 Pinning %s to IPFS via MCP (%.0fKB)...", image_path.name, len(image_data)/1024)
         result = await mcp_client.pin_cid(image_data, content_type="image/jpeg")
         
-        print(f"    ✅ Pinned to IPFS via MCP: ipfs://{result.cid}")
+        logger.debug("    ✅ Pinned to IPFS via MCP: ipfs://%s", result.cid)
         return result.cid
         
     except Exception as e:
-        print(f"    ⚠️ MCP IPFS pinning failed for {image_path}: {e}")
+        logger.warning("    ⚠️ MCP IPFS pinning failed for %s: %s", image_path, e)
         return None
 
 
@@ -253,34 +511,33 @@ async def pin_thumbnail_to_ipfs_direct(thumbnail_data: bytes, filename: str, run
         # Validate thumbnail size
         size_kb = len(thumbnail_data) / 1024
         if size_kb > 200:
-            print(f"    ⚠️ Thumbnail too large ({size_kb:.1f}KB > 200KB): {filename}")
+            logger.warning("    ⚠️ Thumbnail too large (%.1fKB > 200KB): %s", size_kb, filename)
             return None
         
         # Try direct Pinata API first
         pinata_jwt = os.getenv("PINATA_JWT")
         if pinata_jwt:
-            url = "https://api.pinata.cloud/pinning/pinFileToIPFS"
-            headers = {"Authorization": f"Bearer {pinata_jwt}"}
+            session = _get_pinata_session()
             
             thumbnail_filename = f"thumb_{filename.replace('.png', '.jpg')}"
             files = {"file": (thumbnail_filename, BytesIO(thumbnail_data), "image/jpeg")}
             
-            print(f"    📎 Pinning thumbnail {thumbnail_filename} directly to Pinata ({size_kb:.0f}KB)...")
-            response = requests.post(url, files=files, headers=headers)
+            logger.debug("    📎 Pinning thumbnail %s directly to Pinata (%.0fKB)...", thumbnail_filename, size_kb)
+            response = session.post(PINATA_PIN_FILE_URL, files=files, headers=_pinata_headers(pinata_jwt))
             
             if response.status_code == 200:
                 ipfs_hash = response.json()['IpfsHash']
-                print(f"    ✅ Thumbnail pinned directly to IPFS: ipfs://{ipfs_hash}")
+                logger.debug("    ✅ Thumbnail pinned directly to IPFS: ipfs://%s", ipfs_hash)
                 return ipfs_hash
             else:
-                print(f"    ⚠️ Pinata thumbnail API error {response.status_code}: {response.text}")
+                logger.warning("    ⚠️ Pinata thumbnail API error %s: %s", response.status_code, response.text)
         
         # Fallback to MCP server
-        print(f"    🔄 Falling back to MCP server for thumbnail...")
+        logger.debug("    🔄 Falling back to MCP server for thumbnail...")
         return await pin_thumbnail_to_ipfs_mcp(thumbnail_data, filename, run_id)
         
     except Exception as e:
-        print(f"    ⚠️ Direct thumbnail IPFS pinning failed for {filename}: {e}")
+        logger.warning("    ⚠️ Direct thumbnail IPFS pinning failed for %s: %s", filename, e)
         # Fallback to MCP server
         return await pin_thumbnail_to_ipfs_mcp(thumbnail_data, filename, run_id)
 
@@ -300,161 +557,179 @@ async def pin_thumbnail_to_ipfs_mcp(thumbnail_data: bytes, filename: str, run_id
     try:
         # Pin to IPFS via MCP
         mcp_client = get_mcp_client()
-        print(f"    📎 Pinning thumbnail {filename} to IPFS via MCP ({len(thumbnail_data)/1024:.0f}KB)...")
+        logger.debug("    📎 Pinning thumbnail %s to IPFS via MCP (%.0fKB)...", filename, len(thumbnail_data)/1024)
         result = await mcp_client.pin_cid(thumbnail_data, content_type="image/jpeg")
         
-        print(f"    ✅ Thumbnail pinned to IPFS via MCP: ipfs://{result.cid}")
+        logger.debug("    ✅ Thumbnail pinned to IPFS via MCP: ipfs://%s", result.cid)
         return result.cid
         
     except Exception as e:
-        print(f"    ⚠️ MCP thumbnail IPFS pinning failed for {filename}: {e}")
+        logger.warning("    ⚠️ MCP thumbnail IPFS pinning failed for %s: %s", filename, e)
         return None
 
 
-def pin_image_to_ipfs_sync(image_path: pathlib.Path, run_id: str) -> Optional[str]:
+def _prepare_image_payload(
+    image_path: pathlib.Path,
+    raw_bytes: Optional[bytes] = None,
+    image: Optional[Image.Image] = None
+) -> Optional[Tuple[bytes, str]]:
     """
-    Pin image file to IPFS using synchronous requests (no asyncio).
+    Get the bytes to pin for an image, compressing it first if it is over Pinata's 2MB limit.
     
-    Args:
-        image_path: Path to image file
-        run_id: Run ID for logging
-        
     Returns:
-        IPFS CID or None if pinning fails
+        (file data, content type) or None if compression fails
     """
-    try:
-        # Check if image needs compression
-        size_mb = image_path.stat().st_size / (1024 * 1024)
-        
-        if size_mb <= 2.0:
-            # Image is already under limit, use original file
-            print(f"    📎 Using original image ({size_mb:.2f}MB)")
+    # Check if image needs compression
+    size_bytes = len(raw_bytes) if raw_bytes is not None else image_path.stat().st_size
+    size_mb = size_bytes / (1024 * 1024)
+    
+    if size_mb <= 2.0:
+        # Image is already under limit, use original bytes
+        logger.debug("    📎 Using original image (%.2fMB)", size_mb)
+        if raw_bytes is not None:
+            file_data = raw_bytes
+        else:
             with open(image_path, 'rb') as f:
                 file_data = f.read()
-            content_type = "image/png"
-        else:
-            # Image is too large, compress it
-            print(f"    🗜️ Compressing large image ({size_mb:.1f}MB > 2MB)")
-            file_data = compress_image_for_ipfs(image_path, max_size_mb=2.0)
-            if not file_data:
-                print(f"    ⚠️ Image compression failed: {image_path}")
-                return None
-            content_type = "image/jpeg"
-        
-        # Try direct Pinata API first
-        pinata_jwt = os.getenv("PINATA_JWT")
-        if pinata_jwt:
-            url = "https://api.pinata.cloud/pinning/pinFileToIPFS"
-            headers = {"Authorization": f"Bearer {pinata_jwt}"}
-            files = {"file": (image_path.name, file_data, content_type)}
-            
-            print(f"    📎 Pinning {image_path.name} directly to Pinata ({len(file_data)/1024:.0f}KB)...")
-            response = requests.post(url, files=files, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                ipfs_hash = response.json()['IpfsHash']
-                print(f"    ✅ Pinned directly to IPFS: ipfs://{ipfs_hash}")
-                return ipfs_hash
-            else:
-                print(f"    ⚠️ Pinata API error {response.status_code}: {response.text}")
-        
-        # Fallback: return None for now (MCP server sync would need more work)
-        print(f"    ⚠️ No PINATA_JWT configured, skipping IPFS pinning")
-        return None
-        
-    except Exception as e:
-        print(f"    ⚠️ Sync IPFS pinning failed for {image_path}: {e}")
-        return None
+        content_type = "image/png"
+    else:
+        # Image is too large, compress it
+        logger.debug("    🗜️ Compressing large image (%.1fMB > 2MB)", size_mb)
+        file_data = compress_image_for_ipfs(image_path, max_size_mb=2.0, raw_bytes=raw_bytes, image=image)
+        if not file_data:
+            logger.warning("    ⚠️ Image compression failed: %s", image_path)
+            return None
+        content_type = "image/jpeg"
+    
+    return file_data, content_type
 
 
-def pin_thumbnail_to_ipfs_sync(thumbnail_data: bytes, filename: str, run_id: str) -> Optional[str]:
+def pin_art_bundle_sync(
+    image_path: pathlib.Path,
+    image_payload: Tuple[bytes, str],
+    thumbnail_data: bytes,
+    run_id: str
+) -> Optional[Tuple[str, str]]:
     """
-    Pin thumbnail data to IPFS using synchronous requests (no asyncio).
+    Pin an image and its thumbnail to IPFS in one Pinata request.
+    
+    Both files go up in a single multipart POST under a shared directory, so each
+    artwork costs one round trip instead of two. Pinata returns only the directory
+    CID; the files are addressed by path inside it.
     
     Args:
-        thumbnail_data: Thumbnail image bytes
-        filename: Original filename for logging
+        image_path: Path to image file (its name is used inside the directory)
+        image_payload: (file data, content type) from _prepare_image_payload
+        thumbnail_data: Thumbnail JPEG bytes
         run_id: Run ID for logging
         
     Returns:
-        IPFS CID or None if pinning fails
+        (image CID path, thumbnail CID path) such as "<dir cid>/art_1.png", or None if pinning fails
     """
     try:
         # Validate thumbnail size
         size_kb = len(thumbnail_data) / 1024
         if size_kb > 200:
-            print(f"    ⚠️ Thumbnail too large ({size_kb:.1f}KB > 200KB): {filename}")
+            logger.warning("    ⚠️ Thumbnail too large (%.1fKB > 200KB): %s", size_kb, image_path.name)
             return None
         
-        # Try direct Pinata API first
+        file_data, content_type = image_payload
+        
+        # Identical bytes already live at the paths of an earlier pin; reuse them
+        pin_key = _pin_key(file_data, thumbnail_data)
+        cached_paths = _get_cached_pin(pin_key)
+        if cached_paths:
+            logger.debug("    ♻️ %s + thumbnail already pinned: ipfs://%s", image_path.name, cached_paths[0])
+            return cached_paths
+        
         pinata_jwt = os.getenv("PINATA_JWT")
-        if pinata_jwt:
-            url = "https://api.pinata.cloud/pinning/pinFileToIPFS"
-            headers = {"Authorization": f"Bearer {pinata_jwt}"}
-            
-            thumbnail_filename = f"thumb_{filename.replace('.png', '.jpg')}"
-            files = {"file": (thumbnail_filename, BytesIO(thumbnail_data), "image/jpeg")}
-            
-            print(f"    📎 Pinning thumbnail {thumbnail_filename} directly to Pinata ({size_kb:.0f}KB)...")
-            response = requests.post(url, files=files, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                ipfs_hash = response.json()['IpfsHash']
-                print(f"    ✅ Thumbnail pinned directly to IPFS: ipfs://{ipfs_hash}")
-                return ipfs_hash
-            else:
-                print(f"    ⚠️ Pinata thumbnail API error {response.status_code}: {response.text}")
+        if not pinata_jwt:
+            logger.warning("    ⚠️ No PINATA_JWT configured, skipping IPFS pinning")
+            return None
         
-        # Fallback: return None for now
-        print(f"    ⚠️ No PINATA_JWT configured, skipping thumbnail IPFS pinning")
-        return None
+        session = _get_pinata_session()
+        thumbnail_filename = f"thumb_{image_path.stem}.jpg"
+        
+        # A shared path prefix makes Pinata wrap the files in one directory
+        directory = f"{run_id}_{image_path.stem}"
+        files = [
+            ("file", (f"{directory}/{image_path.name}", file_data, content_type)),
+            ("file", (f"{directory}/{thumbnail_filename}", thumbnail_data, "image/jpeg")),
+        ]
+        
+        logger.debug("    📎 Pinning %s + thumbnail to Pinata in one request (%.0fKB)...", image_path.name, (len(file_data) + len(thumbnail_data))/1024)
+        response = session.post(PINATA_PIN_FILE_URL, files=files, headers=_pinata_headers(pinata_jwt), timeout=30)
+        
+        if response.status_code != 200:
+            logger.warning("    ⚠️ Pinata API error %s: %s", response.status_code, response.text)
+            return None
+        
+        directory_cid = response.json()['IpfsHash']
+        logger.debug("    ✅ Pinned directly to IPFS: ipfs://%s", directory_cid)
+        pinned_paths = (f"{directory_cid}/{image_path.name}", f"{directory_cid}/{thumbnail_filename}")
+        _remember_pin(pin_key, pinned_paths)
+        return pinned_paths
         
     except Exception as e:
-        print(f"    ⚠️ Sync thumbnail IPFS pinning failed for {filename}: {e}")
+        logger.warning("    ⚠️ Sync IPFS bundle pinning failed for %s: %s", image_path, e)
         return None
 
 
-def generate_image_openai_real(prompt: str, filename: str, size: str = "1536x1024") -> str:
-    """Generate image using OpenAI gpt-image-1 model."""
-    oa = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+async def generate_image_openai_real(prompt: str, filename: Optional[str] = None, size: Optional[str] = None) -> bytes:
+    """Generate image using OpenAI gpt-image-1 model, returning the PNG bytes (also saved to filename if given)."""
+    oa = _get_openai_client()
+    size = size or target_image_size()
     
-    print(f"    🎨 Calling OpenAI Image Generation... ({time.strftime('%H:%M:%S')})")
+    logger.debug("    🎨 Calling OpenAI Image Generation... (%s)", time.strftime('%H:%M:%S'))
     start_time = time.time()
     
     try:
-        r = oa.images.generate(
+        # gpt-image-1 always returns b64_json (it rejects response_format="url")
+        r = await oa.images.generate(
             model="gpt-image-1",
             prompt=prompt,
             size=size,
-            n=1,
-            timeout=180
+            n=1
         )
         elapsed = time.time() - start_time
-        print(f"    ✅ OpenAI image generated in {elapsed:.1f}s")
+        logger.debug("    ✅ OpenAI image generated in %.1fs", elapsed)
         
-        b64 = r.data[0].b64_json
-        filepath = pathlib.Path(filename)
-        write_b64_image(path=filepath, b64=b64)
+        png_bytes = base64.b64decode(r.data[0].b64_json)
         
-        return str(filepath.absolute())
+        if filename:
+            await asyncio.to_thread(save_image_bytes, png_bytes, filename)
+        return png_bytes
         
     except Exception as e:
         elapsed = time.time() - start_time
-        print(f"    ⚠️ OpenAI generation failed after {elapsed:.1f}s: {e}")
+        logger.warning("    ⚠️ OpenAI generation failed after %.1fs: %s", elapsed, e)
         raise
 
 
-def generate_image_openai(prompt: str, filename: str, size: str = "1536x1024") -> str:
+# Mock overlay font, parsed once on first use instead of on every mock image
+_mock_font: Optional[ImageFont.ImageFont] = None
+
+
+def _get_mock_font() -> ImageFont.ImageFont:
+    """Get the mock overlay font, loading it on first use."""
+    global _mock_font
+    if _mock_font is None:
+        try:
+            # Try to use a default font, fallback to built-in if not available
+            _mock_font = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 40)
+        except OSError:
+            _mock_font = ImageFont.load_default()
+    return _mock_font
+
+
+def generate_image_openai(prompt: str, filename: Optional[str] = None, size: Optional[str] = None) -> bytes:
     """🎭 MOCK: Generate a fake image for testing without OpenAI API calls."""
-    from PIL import Image, ImageDraw, ImageFont
-    import hashlib
-    
-    print(f"    🎭 MOCK: Creating test image... ({time.strftime('%H:%M:%S')})")
+    logger.debug("    🎭 MOCK: Creating test image... (%s)", time.strftime('%H:%M:%S'))
     start_time = time.time()
     
     try:
-        # Parse size (e.g., "1536x1024")
-        width, height = map(int, size.split('x'))
+        # Parse size (e.g., "1024x1024"), matching what the real generator would produce
+        width, height = map(int, (size or target_image_size()).split('x'))
         
         # Create a colorful gradient based on prompt hash
         prompt_hash = hashlib.md5(prompt.encode()).hexdigest()
@@ -462,17 +737,18 @@ def generate_image_openai(prompt: str, filename: str, size: str = "1536x1024") -
         color_g = int(prompt_hash[2:4], 16) 
         color_b = int(prompt_hash[4:6], 16)
         
-        # Create gradient image
-        image = Image.new('RGB', (width, height))
-        draw = ImageDraw.Draw(image)
-        
-        # Create a gradient background
+        # Create a gradient background: build one pixel column, then stretch it across
+        # the width in C instead of drawing a line per row
+        column = bytearray()
         for y in range(height):
             intensity = y / height
-            r = int(color_r * (1 - intensity) + 255 * intensity)
-            g = int(color_g * (1 - intensity) + 255 * intensity)
-            b = int(color_b * (1 - intensity) + 255 * intensity)
-            draw.line([(0, y), (width, y)], fill=(r, g, b))
+            column += bytes((
+                int(color_r * (1 - intensity) + 255 * intensity),
+                int(color_g * (1 - intensity) + 255 * intensity),
+                int(color_b * (1 - intensity) + 255 * intensity),
+            ))
+        image = Image.frombytes('RGB', (1, height), bytes(column)).resize((width, height), Image.Resampling.NEAREST)
+        draw = ImageDraw.Draw(image)
         
         # Add some geometric shapes for visual interest
         draw.ellipse([width//4, height//4, 3*width//4, 3*height//4], 
@@ -481,12 +757,8 @@ def generate_image_openai(prompt: str, filename: str, size: str = "1536x1024") -
                       outline=(color_b, color_r, color_g), width=4)
         
         # Add text overlay
-        try:
-            # Try to use a default font, fallback to built-in if not available
-            font = ImageFont.truetype("/System/Library/Fonts/Arial.ttf", 40)
-        except:
-            font = ImageFont.load_default()
-            
+        font = _get_mock_font()
+        
         text = "MOCK IMAGE"
         prompt_preview = prompt[:30] + "..." if len(prompt) > 30 else prompt
         
@@ -500,26 +772,28 @@ def generate_image_openai(prompt: str, filename: str, size: str = "1536x1024") -
         
         # Background rectangle for text
         draw.rectangle([text_x - 10, text_y - 10, text_x + text_width + 10, text_y + text_height + 10], 
-                      fill=(0, 0, 0, 128))
+                      fill=(0, 0, 0))
         draw.text((text_x, text_y), text, fill=(255, 255, 255), font=font)
         
         # Add prompt preview
         draw.text((width//20, height - 100), f"Prompt: {prompt_preview}", 
                  fill=(255, 255, 255), font=font)
         
-        # Save image
-        filepath = pathlib.Path(filename)
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        image.save(filepath, 'PNG', quality=95)
+        # Encode image
+        buffer = BytesIO()
+        image.save(buffer, 'PNG', quality=95)
+        png_bytes = buffer.getvalue()
+        if filename:
+            save_image_bytes(png_bytes, filename)
         
         elapsed = time.time() - start_time
-        print(f"    ✅ Mock image generated in {elapsed:.3f}s")
+        logger.debug("    ✅ Mock image generated in %.3fs", elapsed)
         
-        return str(filepath.absolute())
+        return png_bytes
         
     except Exception as e:
         elapsed = time.time() - start_time
-        print(f"    ⚠️ Mock generation failed after {elapsed:.1f}s: {e}")
+        logger.warning("    ⚠️ Mock generation failed after %.1fs: %s", elapsed, e)
         raise
 
 
@@ -530,16 +804,24 @@ def create_image_prompts(prompt_seed: Dict[str, Any], date_label: str) -> List[s
     motifs = prompt_seed.get("motifs", ["vintage elements", "historical artifacts", "timeless designs", "classical composition"])
     negative = prompt_seed.get("negative", "modern, futuristic")
     
+    # Prompts are pure f-strings of the seed, so key the cache on their string forms
+    return list(_build_image_prompts(
+        date_label, str(style), str(palette), tuple(str(motif) for motif in motifs), str(negative)
+    ))
+
+
+@functools.lru_cache(maxsize=256)
+def _build_image_prompts(
+    date_label: str, style: str, palette: str, motifs: Tuple[str, ...], negative: str
+) -> Tuple[str, ...]:
+    """Build the prompt variations for a hashable prompt_seed."""
     # Create prompts based on the number of motifs provided
     base_prompt = f"Historical artwork depicting {date_label}, {style}, {palette}"
     
     prompts = []
     for i, motif in enumerate(motifs):
-        variation_words = ["featuring", "with", "incorporating", "showcasing"]
-        avoid_words = ["avoid", "not", "without", "no"]
-        
-        variation_word = variation_words[i % len(variation_words)]
-        avoid_word = avoid_words[i % len(avoid_words)]
+        variation_word = _VARIATION_WORDS[i % len(_VARIATION_WORDS)]
+        avoid_word = _AVOID_WORDS[i % len(_AVOID_WORDS)]
         
         prompt = f"{base_prompt}, {variation_word} {motif}, {avoid_word} {negative}"
         prompts.append(prompt)
@@ -548,10 +830,149 @@ def create_image_prompts(prompt_seed: Dict[str, Any], date_label: str) -> List[s
     if not prompts:
         prompts = [f"{base_prompt}, featuring historical elements, avoid {negative}"]
     
-    return prompts
+    return tuple(prompts)
 
 
-def artist_agent(state: RunState) -> Dict[str, Any]:
+async def _produce_one(i: int, prompt: str, temp_dir: pathlib.Path, run_id: str) -> Tuple[str, str, int]:
+    """
+    Generate, thumbnail, and pin one artwork.
+    
+    Image decoding, thumbnailing, and the synchronous Pinata upload run in worker
+    threads so they never block the event loop. The image and its thumbnail are
+    pinned together in one request.
+    
+    The PNG stays in memory from generation through pinning; it is only written
+    under temp_dir when ARTIST_SAVE_IMAGES is on.
+    
+    Returns:
+        (image_cid, thumbnail_cid, image size in bytes); raises on any failed step
+    """
+    image_path = temp_dir / f"art_{i+1}.png"
+    png_bytes = await generate_image_openai_real(prompt, str(image_path) if save_images_enabled() else None)
+    
+    # Validate image was created successfully
+    if not png_bytes:
+        raise Exception(f"Image not generated: {image_path.name}")
+    artifact = ArtifactInMemory(png_bytes)
+    
+    # Resolve the shared decode up front so the two branches below never race to create it
+    pil_image = None
+    if pyvips is None or artifact.size_mb > 2.0:
+        pil_image = await asyncio.to_thread(lambda: artifact.pil_image)
+    
+    # Prepare the image upload in the background; only oversized images need the decode to compress
+    image_prep = asyncio.create_task(asyncio.to_thread(
+        _prepare_image_payload, image_path, artifact.png_bytes,
+        pil_image if artifact.size_mb > 2.0 else None
+    ))
+    
+    try:
+        # Meanwhile create the thumbnail (libvips shrinks straight from the bytes; PIL shares the decoded image)
+        thumbnail_data = await asyncio.to_thread(
+            create_thumbnail, image_path, 200.0, artifact.png_bytes,
+            pil_image if pyvips is None else None
+        )
+    except BaseException:
+        # Let an in-flight compression finish without letting its outcome replace the thumbnail error
+        await asyncio.gather(image_prep, return_exceptions=True)
+        raise
+    image_payload = await image_prep
+    if not thumbnail_data:
+        raise Exception("Thumbnail creation failed")
+    if not image_payload:
+        raise Exception("Image compression failed")
+    
+    # Pin image and thumbnail together (using synchronous Pinata API): one round trip per artwork
+    pinned = await asyncio.to_thread(pin_art_bundle_sync, image_path, image_payload, thumbnail_data, run_id)
+    if not pinned:
+        raise Exception("IPFS pinning failed")
+    image_cid, thumbnail_cid = pinned
+    
+    return image_cid, thumbnail_cid, len(artifact.png_bytes)
+
+
+async def _produce_indexed(
+    i: int, prompt: str, temp_dir: pathlib.Path, run_id: str, semaphore: asyncio.Semaphore
+) -> Tuple[int, Optional[Tuple[str, str, int]], Optional[Exception]]:
+    """Run _produce_one under the concurrency limit, returning (index, result, error)."""
+    async with semaphore:
+        try:
+            return i, await _produce_one(i, prompt, temp_dir, run_id), None
+        except Exception as e:
+            return i, None, e
+
+
+def get_cached_art_set(prompts: List[str]) -> Optional[Dict[str, Any]]:
+    """Get a copy of the ArtSet previously generated for exactly these prompts."""
+    key = tuple(prompts)
+    with _art_set_cache_lock:
+        art_set = _art_set_cache.get(key)
+        if art_set is None:
+            return None
+        _art_set_cache.move_to_end(key)
+    return {field: list(values) for field, values in art_set.items()}
+
+
+def cache_art_set(prompts: List[str], art_set: Dict[str, Any]) -> None:
+    """Remember a fully generated ArtSet, evicting the least recently used entry."""
+    key = tuple(prompts)
+    with _art_set_cache_lock:
+        _art_set_cache[key] = {field: list(values) for field, values in art_set.items()}
+        _art_set_cache.move_to_end(key)
+        while len(_art_set_cache) > ART_SET_CACHE_SIZE:
+            _art_set_cache.popitem(last=False)
+
+
+def semantic_cache_enabled() -> bool:
+    """Check whether near-duplicate seed lookups are switched on."""
+    return os.getenv("ARTIST_SEMANTIC_CACHE", "false").lower() == "true"
+
+
+def seed_cache_text(prompt_seed: Dict[str, Any], date_label: str) -> str:
+    """Canonical text for a prompt_seed, independent of key and motif order."""
+    motifs = sorted(str(motif) for motif in prompt_seed.get("motifs", []))
+    return " | ".join([
+        date_label,
+        str(prompt_seed.get("style", "")),
+        str(prompt_seed.get("palette", "")),
+        ", ".join(motifs),
+        str(prompt_seed.get("negative", "")),
+    ])
+
+
+async def embed_seed_text(text: str) -> Tuple[float, ...]:
+    """Embed seed text as a unit vector so cosine similarity is a plain dot product."""
+    response = await _get_openai_client().embeddings.create(model=SEMANTIC_CACHE_MODEL, input=text)
+    vector = response.data[0].embedding
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return tuple(x / norm for x in vector)
+
+
+def find_similar_art_set(vector: Tuple[float, ...]) -> Optional[Tuple[float, Dict[str, Any]]]:
+    """Get the most similar cached ArtSet and its similarity, if it clears the threshold."""
+    best_key, best_score = None, SEMANTIC_CACHE_THRESHOLD
+    with _art_set_cache_lock:
+        for key, (cached_vector, _) in _semantic_cache.items():
+            score = sum(a * b for a, b in zip(vector, cached_vector))
+            if score >= best_score:
+                best_key, best_score = key, score
+        if best_key is None:
+            return None
+        _semantic_cache.move_to_end(best_key)
+        art_set = _semantic_cache[best_key][1]
+    return best_score, {field: list(values) for field, values in art_set.items()}
+
+
+def remember_seed(text: str, vector: Tuple[float, ...], art_set: Dict[str, Any]) -> None:
+    """Index a fully generated ArtSet by its seed embedding."""
+    with _art_set_cache_lock:
+        _semantic_cache[text] = (vector, {field: list(values) for field, values in art_set.items()})
+        _semantic_cache.move_to_end(text)
+        while len(_semantic_cache) > ART_SET_CACHE_SIZE:
+            _semantic_cache.popitem(last=False)
+
+
+async def artist_agent(state: RunState) -> Dict[str, Any]:
     """
     Artist Agent: Generate art based on LorePack using OpenAI gpt-image-1 with IPFS integration
     
@@ -568,159 +989,112 @@ def artist_agent(state: RunState) -> Dict[str, Any]:
     date_label = state.get("date_label", "Unknown Event")
     lore = state.get("lore")
     
-    # Collect all messages to return to workflow (initialize early)
+    # Messages for the workflow to merge; progress already streamed to the run isn't repeated here
     all_messages = []
     
     if not lore:
-        error_message = {
-            "agent": "Artist",
-            "level": "error", 
-            "message": "Missing lore data",
-            "ts": str(uuid.uuid4())
-        }
-        all_messages.append(error_message)
+        all_messages.append(_msg("error", "Missing lore data"))
         return {
             "error": "No lore data available for art generation",
             "messages": all_messages
         }
     
-    # Small delay to allow SSE polling to detect intermediate state changes
-    time.sleep(0.05)  # 50ms delay for real-time streaming
-    
     prompt_seed = lore.get("prompt_seed", {})
-    print(f"🎨 ARTIST: Starting image generation for {run_id} - {date_label}")
-    print(f"🎨 ARTIST: Using prompt_seed: {prompt_seed}")
+    logger.debug("🎨 ARTIST: Starting image generation for %s - %s", run_id, date_label)
+    logger.debug("🎨 ARTIST: Using prompt_seed: %s", prompt_seed)
     
     # Emit initial Artist message
-    start_message = {
-        "agent": "Artist",
-        "level": "info",
-        "message": f"🎨 Artist agent activated - preparing to generate artworks for {date_label}",
-        "ts": str(uuid.uuid4())
-    }
-    all_messages.append(start_message)
-    print(f"🎨 ARTIST: Created start message")
-    
-    # Emit start message immediately to simple_state for real-time SSE streaming
-    if run_id:
-        import simple_state
-        current_state = simple_state.get_run_state(run_id) or {}
-        current_messages = current_state.get("messages", [])
-        current_messages.append(start_message)
-        simple_state.update_run_state(run_id, {"messages": current_messages})
-        print(f"🎨 ARTIST: Added start message to state, total messages: {len(current_messages)}")
-    
-    # Create temp directory for generated images
+    stream_progress(run_id, all_messages, _msg("info", f"🎨 Artist agent activated - preparing to generate artworks for {date_label}"))
+    
+    # Debug copies of generated images go here when ARTIST_SAVE_IMAGES is on
     temp_dir = pathlib.Path("temp_images") / run_id
-    temp_dir.mkdir(parents=True, exist_ok=True)
     
     try:
         # Generate image prompts based on lore pack
         prompts = create_image_prompts(prompt_seed, date_label)
-        print(f"🎨 ARTIST: Generated {len(prompts)} image prompts")
+        logger.debug("🎨 ARTIST: Generated %s image prompts", len(prompts))
         
-        # Generate images using OpenAI gpt-image-1 with IPFS integration
-        generated_cids = []
-        thumbnail_cids = []
-        style_notes = []
+        # Exact replay of a seed we already rendered: reuse the pinned artworks
+        cached_art_set = get_cached_art_set(prompts)
+        cache_note = "already generated for these exact prompts"
         
-        for i, prompt in enumerate(prompts):
-            filename = temp_dir / f"art_{i+1}.png"
-            print(f"🎨 ARTIST: Generating image {i+1}/4: {prompt[:100]}...")
+        # Otherwise look for a near-duplicate seed by embedding similarity
+        seed_text, seed_vector = None, None
+        if cached_art_set is None and semantic_cache_enabled():
+            seed_text = seed_cache_text(prompt_seed, date_label)
+            try:
+                seed_vector = await embed_seed_text(seed_text)
+                match = find_similar_art_set(seed_vector)
+            except Exception as e:
+                logger.warning("🎨 ARTIST: Seed embedding failed, skipping semantic cache: %s", e)
+                match = None
+            if match:
+                similarity, cached_art_set = match
+                cache_note = f"for a near-identical seed (similarity {similarity:.2f})"
+        
+        if cached_art_set is not None:
+            all_messages.append(_msg(
+                "success", f"🎨 Reusing {len(cached_art_set['cids'])} artworks {cache_note}",
+                links=numbered_links("Art #{}", cached_art_set["cids"])
+            ))
             
-            # Create progress message
-            progress_message = {
-                "agent": "Artist",
-                "level": "info", 
-                "message": f"Generating image {i+1}/{len(prompts)} using OpenAI gpt-image-1...",
-                "ts": str(uuid.uuid4())
+            logger.debug("🎨 ARTIST: Cache hit, reusing %s images %s", len(cached_art_set['cids']), cache_note)
+            return {
+                "art": cached_art_set,
+                "messages": all_messages
             }
-            all_messages.append(progress_message)
-            print(f"🎨 ARTIST: Added progress message {i+1}/{len(prompts)}")
+        
+        # Generate images using OpenAI gpt-image-1 with IPFS integration
+        generated_cids: List[Optional[str]] = [None] * len(prompts)
+        thumbnail_cids: List[Optional[str]] = [None] * len(prompts)
+        style_notes: List[Optional[str]] = [None] * len(prompts)
+        
+        for i, prompt in enumerate(prompts):
+            logger.debug("🎨 ARTIST: Generating image %s/%s: %s...", i+1, len(prompts), prompt[:100])
             
-            # Emit progress message immediately to simple_state for real-time SSE streaming
-            if run_id:
-                current_state = simple_state.get_run_state(run_id) or {}
-                current_messages = current_state.get("messages", [])
-                current_messages.append(progress_message)
-                simple_state.update_run_state(run_id, {"messages": current_messages})
-                print(f"🎨 ARTIST: Added progress message {i+1}/{len(prompts)} to state, total messages: {len(current_messages)}")
+            # Queue progress message for real-time SSE streaming
+            stream_progress(run_id, all_messages, _msg("info", f"Generating image {i+1}/{len(prompts)} using OpenAI gpt-image-1..."))
+        
+        # Each image's generate → thumbnail → pin chain is independent and network-bound,
+        # so run whole chains concurrently and report each one as soon as it finishes
+        semaphore = asyncio.Semaphore(MAX_IMAGE_WORKERS)
+        successful_gens = 0
+        productions = [
+            _produce_indexed(i, prompt, temp_dir, run_id, semaphore)
+            for i, prompt in enumerate(prompts)
+        ]
+        
+        for next_done in asyncio.as_completed(productions):
+            i, produced, error = await next_done
             
-            try:
-                # Generate image using real OpenAI API
-                filepath = generate_image_openai_real(prompt, str(filename))
-                filepath_obj = pathlib.Path(filepath)
-                
-                # Validate image was created successfully
-                if not filepath_obj.exists():
-                    raise Exception(f"Image file not created: {filepath}")
-                
-                # Create thumbnail
-                thumbnail_data = create_thumbnail(filepath_obj, max_size_kb=200.0)
-                if not thumbnail_data:
-                    raise Exception("Thumbnail creation failed")
-                
-                # Pin image to IPFS (using synchronous Pinata API)
-                image_cid = pin_image_to_ipfs_sync(filepath_obj, run_id)
-                if not image_cid:
-                    raise Exception("Image IPFS pinning failed")
-                
-                # Pin thumbnail to IPFS (using synchronous Pinata API)
-                thumbnail_cid = pin_thumbnail_to_ipfs_sync(thumbnail_data, f"art_{i+1}.png", run_id)
-                if not thumbnail_cid:
-                    raise Exception("Thumbnail IPFS pinning failed")
+            if error is None:
+                image_cid, thumbnail_cid, size_bytes = produced
+                successful_gens += 1
                 
                 # Store IPFS CIDs
-                generated_cids.append(f"ipfs://{image_cid}")
-                thumbnail_cids.append(f"ipfs://{thumbnail_cid}")
+                generated_cids[i] = f"ipfs://{image_cid}"
+                thumbnail_cids[i] = f"ipfs://{thumbnail_cid}"
                 
                 # Create style note based on the prompt variation
                 motifs = prompt_seed.get("motifs", ["historical elements"])
                 motif = motifs[i] if i < len(motifs) else f"variation {i+1}"
-                style_notes.append(f"Historical artwork featuring {motif} in {prompt_seed.get('style', 'classic')} style")
-                
-                # Create completion message
-                completion_message = {
-                    "agent": "Artist",
-                    "level": "success",
-                    "message": f"Image {i+1}/{len(prompts)} generated and pinned to IPFS ({os.path.getsize(filepath)/1024/1024:.1f}MB → ipfs://{image_cid})",
-                    "ts": str(uuid.uuid4())
-                }
-                all_messages.append(completion_message)
-                print(f"🎨 ARTIST: Added completion message {i+1}/{len(prompts)}")
+                style_notes[i] = f"Historical artwork featuring {motif} in {prompt_seed.get('style', 'classic')} style"
                 
-                # Emit completion message immediately to simple_state for real-time SSE streaming
-                if run_id:
-                    current_state = simple_state.get_run_state(run_id) or {}
-                    current_messages = current_state.get("messages", [])
-                    current_messages.append(completion_message)
-                    simple_state.update_run_state(run_id, {"messages": current_messages})
-                    print(f"🎨 ARTIST: Added completion message {i+1}/{len(prompts)} to state, total messages: {len(current_messages)}")
+                # Queue completion message for real-time SSE streaming
+                stream_progress(run_id, all_messages, _msg(
+                    "success",
+                    f"Image {i+1}/{len(prompts)} generated and pinned to IPFS ({size_bytes/1048576:.1f}MB → ipfs://{image_cid})"
+                ))
                 
-            except Exception as e:
-                print(f"🎨 ARTIST: Failed to generate or pin image {i+1}: {e}")
+            else:
+                logger.warning("🎨 ARTIST: Failed to generate or pin image %s: %s", i+1, error)
                 # Use placeholder CIDs for failed generation
-                generated_cids.append(f"ipfs://placeholder_art_{i+1}")
-                thumbnail_cids.append(f"ipfs://placeholder_thumb_{i+1}")
-                style_notes.append(f"Image generation or IPFS pinning failed for variation {i+1}")
+                generated_cids[i] = f"ipfs://placeholder_art_{i+1}"
+                thumbnail_cids[i] = f"ipfs://placeholder_thumb_{i+1}"
+                style_notes[i] = f"Image generation or IPFS pinning failed for variation {i+1}"
                 
-                # Create error message
-                error_message = {
-                    "agent": "Artist",
-                    "level": "warning",
-                    "message": f"Image {i+1}/{len(prompts)} generation/pinning failed: {str(e)[:50]}",
-                    "ts": str(uuid.uuid4())
-                }
-                all_messages.append(error_message)
-                print(f"🎨 ARTIST: Added error message {i+1}/{len(prompts)}")
-                
-                # Emit error message immediately to simple_state for real-time SSE streaming
-                if run_id:
-                    current_state = simple_state.get_run_state(run_id) or {}
-                    current_messages = current_state.get("messages", [])
-                    current_messages.append(error_message)
-                    simple_state.update_run_state(run_id, {"messages": current_messages})
-                    print(f"🎨 ARTIST: Added error message {i+1}/{len(prompts)} to state, total messages: {len(current_messages)}")
+                # Queue error message for real-time SSE streaming
+                stream_progress(run_id, all_messages, _msg("warning", f"Image {i+1}/{len(prompts)} generation/pinning failed: {str(error)[:50]}"))
         
         # Create art set with IPFS CIDs
         art_set = {
@@ -729,87 +1103,38 @@ def artist_agent(state: RunState) -> Dict[str, Any]:
             "style_notes": style_notes
         }
         
-        # Count successful generations
-        successful_gens = len([cid for cid in generated_cids if not cid.startswith("ipfs://placeholder")])
-        
-        # Final summary message
-        final_message = {
-            "agent": "Artist",
-            "level": "success",
-            "message": f"🎨 All images complete! Generated {successful_gens}/{len(prompts)} artworks ready for voting",
-            "ts": str(uuid.uuid4()),
-            "links": [
-                {"label": f"Art #{i+1}", "href": cid} 
-                for i, cid in enumerate(generated_cids)
-            ]
-        }
-        all_messages.append(final_message)
+        # Final summary goes back with the art set for the workflow to merge
+        all_messages.append(_msg(
+            "success",
+            f"🎨 All images complete! Generated {successful_gens}/{len(prompts)} artworks ready for voting",
+            links=numbered_links("Art #{}", generated_cids)
+        ))
         
-        # Emit final message immediately to simple_state for real-time SSE streaming
-        if run_id:
-            current_state = simple_state.get_run_state(run_id) or {}
-            current_messages = current_state.get("messages", [])
-            current_messages.append(final_message)
-            
-            # Update state with final message and art set
-            simple_state.update_run_state(run_id, {
-                "messages": current_messages,
-                "art": art_set  # Include the art set in the state update
-            })
-            print(f"🎨 ARTIST: Added final message to state, total messages: {len(current_messages)}")
+        # Only complete sets are worth replaying; partial ones should get another chance
+        if successful_gens == len(prompts):
+            cache_art_set(prompts, art_set)
+            if seed_vector is not None:
+                remember_seed(seed_text, seed_vector, art_set)
         
-        print(f"🎨 ARTIST: Successfully generated {successful_gens}/{len(prompts)} images")
+        logger.debug("🎨 ARTIST: Successfully generated %s/%s images", successful_gens, len(prompts))
         
     except Exception as e:
-        print(f"🎨 ARTIST: Image generation completely failed: {e}")
+        logger.warning("🎨 ARTIST: Image generation completely failed: %s", e)
         
-        # Fallback to placeholder art set  
-        art_set = {
-            "cids": [
-                "ipfs://fallback_placeholder_1",
-                "ipfs://fallback_placeholder_2", 
-                "ipfs://fallback_placeholder_3",
-                "ipfs://fallback_placeholder_4"
-            ],
-            "thumbnails": [
-                "ipfs://fallback_thumb_1",
-                "ipfs://fallback_thumb_2",
-                "ipfs://fallback_thumb_3",
-                "ipfs://fallback_thumb_4"
-            ],
-            "style_notes": [
-                "Image generation failed - using fallback placeholder",
-                "Image generation failed - using fallback placeholder",
-                "Image generation failed - using fallback placeholder", 
-                "Image generation failed - using fallback placeholder"
-            ]
-        }
+        # Fallback to placeholder art set (a fresh dict over the shared, read-only tuples)
+        art_set = dict(_FALLBACK_ART_SET)
         
-        error_message = {
-            "agent": "Artist",
-            "level": "warning",
-            "message": f"Image generation failed, using fallback placeholders: {str(e)[:100]}",
-            "ts": str(uuid.uuid4()),
-            "links": []
-        }
-        all_messages.append(error_message)
-        
-        # Emit fallback error message immediately to simple_state for real-time SSE streaming
+        all_messages.append(_msg("warning", f"Image generation failed, using fallback placeholders: {str(e)[:100]}", links=[]))
+    
+    finally:
         if run_id:
-            current_state = simple_state.get_run_state(run_id) or {}
-            current_messages = current_state.get("messages", [])
-            current_messages.append(error_message)
-            
-            # Update state with error message and fallback art set
-            simple_state.update_run_state(run_id, {
-                "messages": current_messages,
-                "art": art_set  # Include the fallback art set in the state update
-            })
-            print(f"🎨 ARTIST: Added fallback error message to state, total messages: {len(current_messages)}")
+            # Queued progress must land before the workflow merges our messages
+            simple_state.message_buffer.flush(run_id)
     
     result = {
         "art": art_set,
-        "messages": all_messages  # Return ALL collected messages to workflow
+        "messages": all_messages
     }
-    print(f"🎨 ARTIST: Returning {len(result['messages'])} messages: {[msg['agent'] for msg in result['messages']]}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("🎨 ARTIST: Returning %s messages: %s", len(result['messages']), [msg['agent'] for msg in result['messages']])
     return result
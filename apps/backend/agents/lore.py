@@ -1,14 +1,78 @@
 """
 Lore Agent - Research and context generation using real LLM integration
 """
-import uuid
+import copy
+import functools
 import logging
-from typing import Dict, Any
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
 from state import RunState, LorePack
+from messages import agent_message, numbered_links
 from services import get_llm_client
+import simple_state
 
 logger = logging.getLogger(__name__)
 
+# Messages from this agent: _msg(level, message, **extra)
+_msg = functools.partial(agent_message, "Lore")
+
+# Date-independent parts of the fallback lore pack used when LLM research fails; sequences are
+# tuples since nothing downstream mutates them
+_FALLBACK_SUMMARY_TEMPLATE = """
+# {date_label}
+
+This historical date represents an important moment in time. While our research systems encountered an issue, {date_label} likely marks significant developments in technology, culture, or society. Historical events on this date may have influenced digital innovation, community development, or technological progress.
+
+The significance of this date extends to broader themes of human progress, technological advancement, and social change that continue to shape our modern world.
+""".strip()
+_FALLBACK_BULLET_FACTS = (
+    "Significant moment in historical timeline",
+    "Potential technological or cultural milestone",
+    "Impact on societal development",
+    "Foundation for future innovations",
+    "Influence on modern digital culture",
+)
+_FALLBACK_SOURCES = (
+    "https://en.wikipedia.org/wiki/Timeline_of_computing",
+    "https://www.britannica.com/technology/history-of-technology",
+    "https://www.computerhistory.org/timeline/",
+    "https://timeline.web.cern.ch/",
+    "https://www.historyoftechnology.org/",
+)
+_FALLBACK_PROMPT_SEED = {
+    "style": "historical, documentary, classical art style",
+    "palette": "warm browns, gold, sepia tones, classic colors",
+    "motifs": ("vintage elements", "historical artifacts", "traditional patterns", "timeless designs"),
+    "negative": "modern, futuristic, digital"
+}
+
+# Validated LLM lore packs keyed by (date_label, edit_instructions), so repeat runs for a date skip the research call
+LORE_CACHE_SIZE = 128
+_lore_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+
+def get_cached_lore_pack(key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+    """Get a copy of the lore pack previously researched for this key."""
+    lore_pack = _lore_cache.get(key)
+    if lore_pack is None:
+        return None
+    _lore_cache.move_to_end(key)
+    return copy.deepcopy(lore_pack)
+
+
+def cache_lore_pack(key: Tuple[str, str], lore_pack: Dict[str, Any]) -> None:
+    """Remember a validated lore pack, evicting the least recently used entry."""
+    _lore_cache[key] = copy.deepcopy(lore_pack)
+    _lore_cache.move_to_end(key)
+    while len(_lore_cache) > LORE_CACHE_SIZE:
+        _lore_cache.popitem(last=False)
+
+
+@functools.lru_cache(maxsize=32)
+def _count_words(text: str) -> int:
+    """Count whitespace-separated words; memoized so validation and messages share one pass."""
+    return len(text.split())
+
 
 def validate_lore_pack(lore_pack_dict: Dict[str, Any], date_label: str) -> None:
     """
@@ -21,12 +85,19 @@ def validate_lore_pack(lore_pack_dict: Dict[str, Any], date_label: str) -> None:
     Raises:
         ValueError: If validation fails
     """
+    # Check field types, since the LLM's JSON reaches here without a model parsing it
+    for field_name, field_type in (("summary_md", str), ("bullet_facts", (list, tuple)), ("sources", (list, tuple)), ("prompt_seed", dict)):
+        if not isinstance(lore_pack_dict.get(field_name), field_type):
+            raise ValueError(f"{field_name} has the wrong type for date: {date_label}")
+    if not all(isinstance(item, str) for item in (*lore_pack_dict["bullet_facts"], *lore_pack_dict["sources"])):
+        raise ValueError(f"bullet_facts and sources must contain only strings for date: {date_label}")
+    
     # Check summary_md word count (≤200 words)
     summary = lore_pack_dict.get("summary_md", "")
     if not summary:
         raise ValueError(f"summary_md is empty for date: {date_label}")
     
-    word_count = len(summary.split())
+    word_count = _count_words(summary)
     if word_count > 200:
         raise ValueError(f"summary_md has {word_count} words, must be ≤200 for date: {date_label}")
     
@@ -75,79 +146,56 @@ async def lore_agent(state: RunState) -> Dict[str, Any]:
     edit_instructions = state.get("edit_instructions")
     is_regenerating = state.get("regenerating", False)
     
-    # Create progress message for LLM research and emit it immediately
-    if is_regenerating and edit_instructions:
-        research_message = {
-            "agent": "Lore",
-            "level": "info", 
-            "message": f"Regenerating lore for {date_label} based on your feedback...",
-            "ts": str(uuid.uuid4())
-        }
-    else:
-        research_message = {
-            "agent": "Lore",
-            "level": "info", 
-            "message": f"Researching historical significance of {date_label}...",
-            "ts": str(uuid.uuid4())
-        }
+    applying_feedback = bool(is_regenerating and edit_instructions)
     
-    # Emit the "researching" message immediately for real-time UX
-    print(f"🧠 LORE: Starting research for {run_id} - {date_label}")
+    # Emit the "researching" message right away for real-time UX (buffered with any other agent events);
+    # it only ever goes to the stream, so skip building it when there is no run to stream to
+    logger.debug("🧠 LORE: Starting research for %s - %s", run_id, date_label)
     if run_id:
-        import simple_state
-        current_state = simple_state.get_run_state(run_id) or {}
-        current_messages = current_state.get("messages", [])
-        current_messages.append(research_message)
-        simple_state.update_run_state(run_id, {"messages": current_messages})
-        print(f"🧠 LORE: Immediately emitted research message, state now has {len(current_messages)} messages")
+        research_message = _msg(
+            "info",
+            f"Regenerating lore for {date_label} based on your feedback..." if applying_feedback
+            else f"Researching historical significance of {date_label}..."
+        )
+        simple_state.message_buffer.append(run_id, research_message)
+        logger.debug("🧠 LORE: Queued research message for streaming")
     
     try:
-        # Get LLM client and generate real historical research
-        llm_client = get_llm_client()
-        logger.info(f"Starting LLM research for date: {date_label}")
+        # Regenerations must produce fresh research, so only the initial pass reuses a cached pack
+        cache_key = (date_label, edit_instructions or "")
+        lore_pack_dict = None if is_regenerating else get_cached_lore_pack(cache_key)
         
-        # Use the specialized generate_lore_pack method with optional edit instructions
-        lore_pack_model, llm_response = await llm_client.generate_lore_pack(date_label, edit_instructions)
-        
-        # Convert Pydantic model to dict for state compatibility
-        lore_pack_dict = lore_pack_model.model_dump()
-        
-        # Validate the generated content meets spec requirements
-        validate_lore_pack(lore_pack_dict, date_label)
+        if lore_pack_dict is not None:
+            logger.info("Reusing cached lore research for date: %s", date_label)
+        else:
+            # Get LLM client and generate real historical research
+            llm_client = get_llm_client()
+            logger.info("Starting LLM research for date: %s", date_label)
+            
+            # Request the lore pack as a plain dict (state stores dicts) with optional edit instructions
+            lore_pack_dict, llm_response = await llm_client.generate_lore_pack_dict(date_label, edit_instructions)
+            
+            # Validate the generated content meets spec requirements (types included, as no model parsed it)
+            validate_lore_pack(lore_pack_dict, date_label)
+            
+            logger.info("LLM research completed for %s: %s tokens used", date_label, llm_response.usage['total_tokens'])
+            if not is_regenerating:
+                cache_lore_pack(cache_key, lore_pack_dict)
         
-        logger.info(f"LLM research completed for {date_label}: {llm_response.usage['total_tokens']} tokens used")
+        word_count = _count_words(lore_pack_dict['summary_md'])
         
         # Create success message with source links
-        if is_regenerating and edit_instructions:
-            success_message = {
-                "agent": "Lore", 
-                "level": "success",
-                "message": f"Regenerated historical research for {date_label} based on your feedback ({len(lore_pack_dict['summary_md'].split())} words, {len(lore_pack_dict['bullet_facts'])} facts, {len(lore_pack_dict['sources'])} sources)",
-                "ts": str(uuid.uuid4()),
-                "links": [
-                    {"label": f"Source {i+1}", "href": url} 
-                    for i, url in enumerate(lore_pack_dict["sources"][:3])
-                ]
-            }
-        else:
-            success_message = {
-                "agent": "Lore", 
-                "level": "success",
-                "message": f"Generated historical research for {date_label} ({len(lore_pack_dict['summary_md'].split())} words, {len(lore_pack_dict['bullet_facts'])} facts, {len(lore_pack_dict['sources'])} sources)",
-                "ts": str(uuid.uuid4()),
-                "links": [
-                    {"label": f"Source {i+1}", "href": url} 
-                    for i, url in enumerate(lore_pack_dict["sources"][:3])
-                ]
-            }
+        prefix, suffix = ("Regenerated", " based on your feedback") if applying_feedback else ("Generated", "")
+        success_message = _msg(
+            "success",
+            f"{prefix} historical research for {date_label}{suffix} ({word_count} words, {len(lore_pack_dict['bullet_facts'])} facts, {len(lore_pack_dict['sources'])} sources)",
+            links=numbered_links("Source {}", lore_pack_dict["sources"][:3])
+        )
         
-        print(f"🧠 LORE: Research completed for {run_id} - {len(lore_pack_dict['summary_md'].split())} words")
+        logger.debug("🧠 LORE: Research completed for %s - %s words", run_id, word_count)
         
         # Create a formatted lore content message for user review
-        lore_content_message = {
-            "agent": "Lore",
-            "level": "info",
-            "message": f"""📜 Generated Lore for {date_label}
+        lore_content_message = _msg("info", f"""📜 Generated Lore for {date_label}
 
 {lore_pack_dict['summary_md']}
 
@@ -157,9 +205,7 @@ async def lore_agent(state: RunState) -> Dict[str, Any]:
 🎨 Art Generation Style:
 • Style: {lore_pack_dict['prompt_seed']['style']}
 • Palette: {lore_pack_dict['prompt_seed']['palette']}  
-• Motifs: {', '.join(lore_pack_dict['prompt_seed']['motifs'])}""",
-            "ts": str(uuid.uuid4())
-        }
+• Motifs: {', '.join(lore_pack_dict['prompt_seed']['motifs'])}""")
         
         # Only return the success message since research message was already emitted immediately
         result = {
@@ -170,59 +216,36 @@ async def lore_agent(state: RunState) -> Dict[str, Any]:
         # Only set checkpoint if this is initial generation, not regeneration
         if not is_regenerating:
             result["checkpoint"] = "lore_approval"
-        print(f"🧠 LORE: Returning {len(result['messages'])} messages: {[msg['agent'] for msg in result['messages']]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🧠 LORE: Returning %s messages: %s", len(result['messages']), [msg['agent'] for msg in result['messages']])
+        if run_id:
+            # The research message must land before the workflow merges ours
+            simple_state.message_buffer.flush(run_id)
         return result
         
     except Exception as e:
-        logger.error(f"Lore agent failed for date {date_label}: {e}")
+        logger.error("Lore agent failed for date %s: %s", date_label, e)
         
-        # Create fallback lore pack for demo reliability
+        # Create fallback lore pack for demo reliability (only the date varies)
         fallback_lore_pack = {
-            "summary_md": f"""
-# {date_label}
-
-This historical date represents an important moment in time. While our research systems encountered an issue, {date_label} likely marks significant developments in technology, culture, or society. Historical events on this date may have influenced digital innovation, community development, or technological progress.
-
-The significance of this date extends to broader themes of human progress, technological advancement, and social change that continue to shape our modern world.
-            """.strip(),
-            
-            "bullet_facts": [
-                f"Historical date: {date_label}",
-                "Significant moment in historical timeline",
-                "Potential technological or cultural milestone",
-                "Impact on societal development",
-                "Foundation for future innovations",
-                "Influence on modern digital culture"
-            ],
-            
-            "sources": [
-                "https://en.wikipedia.org/wiki/Timeline_of_computing",
-                "https://www.britannica.com/technology/history-of-technology", 
-                "https://www.computerhistory.org/timeline/",
-                "https://timeline.web.cern.ch/",
-                "https://www.historyoftechnology.org/"
-            ],
-            
-            "prompt_seed": {
-                "style": "historical, documentary, classical art style",
-                "palette": "warm browns, gold, sepia tones, classic colors",
-                "motifs": ["vintage elements", "historical artifacts", "traditional patterns", "timeless designs"],
-                "negative": "modern, futuristic, digital"
-            }
+            "summary_md": _FALLBACK_SUMMARY_TEMPLATE.format(date_label=date_label),
+            "bullet_facts": [f"Historical date: {date_label}", *_FALLBACK_BULLET_FACTS],
+            # Read-only downstream (validation, prompts, metadata), so the tuples are shared as-is
+            "sources": _FALLBACK_SOURCES,
+            "prompt_seed": dict(_FALLBACK_PROMPT_SEED)
         }
         
         # Validate fallback meets requirements
         validate_lore_pack(fallback_lore_pack, date_label)
         
-        error_message = {
-            "agent": "Lore",
-            "level": "warning",
-            "message": f"Research error for {date_label}, using fallback content: {str(e)[:100]}...",
-            "ts": str(uuid.uuid4()),
-            "links": [{"label": f"Source {i+1}", "href": url} for i, url in enumerate(fallback_lore_pack["sources"][:3])]
-        }
+        error_message = _msg(
+            "warning", f"Research error for {date_label}, using fallback content: {str(e)[:100]}...",
+            links=numbered_links("Source {}", fallback_lore_pack["sources"][:3])
+        )
         
-        print(f"🧠 LORE: Using fallback content for {run_id} due to error")
+        logger.debug("🧠 LORE: Using fallback content for %s due to error", run_id)
+        if run_id:
+            simple_state.message_buffer.flush(run_id)
         
         # Only return the error message since research message was already emitted immediately above
         return {
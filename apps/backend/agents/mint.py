@@ -1,12 +1,103 @@
 """
 Mint Agent - Handle NFT minting via MCP tools with real IPFS and blockchain integration
 """
-import uuid
-from typing import Dict, Any
-from state import RunState, MintReceipt, PreparedTx
-from services.mcp_client import get_mcp_client
+import asyncio
+import functools
+import logging
+from typing import Dict, Any, List
+from state import RunState, MintReceipt, PreparedTx, AgentMessage
+from messages import agent_message, stream_progress
+from services.mcp_client import get_mcp_client, PreparedTx as MCPPreparedTx
 import simple_state
 
+logger = logging.getLogger(__name__)
+
+# HTTP gateway used for metadata image URLs (better explorer compatibility than ipfs://)
+IPFS_GATEWAY_PREFIX = "https://ipfs.io/ipfs/"
+
+# App-side gas floors applied on top of the MCP server's estimate (safety margins, not re-estimates);
+# closing a vote needs more because the contract loops over options to find the winner
+MINT_GAS_FLOOR = 200_000
+CLOSE_VOTE_GAS_FLOOR = 300_000
+
+# NFT metadata trait names, in attribute order
+_TRAIT_TYPES = ("Date", "Winner CID", "Sources", "Art Style", "Participation", "Voting Method")
+
+# Placeholder vote ID that means the real one never propagated through state
+_ZERO_VOTE_ID = "0x" + "0" * 64
+
+
+def ipfs_to_http(cid: str) -> str:
+    """Convert an ipfs:// URI (or bare CID) to its HTTP gateway URL."""
+    if cid.startswith('ipfs://'):
+        cid = cid[7:]  # Remove 'ipfs://' prefix
+    return IPFS_GATEWAY_PREFIX + cid
+
+
+def _truncate(text: str, limit: int) -> str:
+    """Cut text to limit characters with a trailing ellipsis, leaving short text untouched."""
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
+
+def _with_gas_floor(tx: MCPPreparedTx, floor: int) -> MCPPreparedTx:
+    """Raise the transaction's gas to at least floor (a missing estimate counts as zero)."""
+    tx.gas = max(tx.gas or 0, floor)
+    return tx
+
+
+# Messages from this agent: _msg(level, message, **extra)
+_msg = functools.partial(agent_message, "Mint")
+
+
+def _mint_links(metadata_cid: str, winner_cid: str) -> List[Dict[str, str]]:
+    """Links shown on the mint checkpoint message."""
+    return [
+        {"label": "Metadata Preview", "href": metadata_cid},
+        {"label": "Winner Art", "href": winner_cid}
+    ]
+
+
+def _tx_dict(tx: MCPPreparedTx) -> Dict[str, Any]:
+    """State form of a transaction prepared by the MCP server."""
+    return {"to": tx.to, "data": tx.data, "value": tx.value, "gas": tx.gas}
+
+
+def _pending_receipt(metadata_cid: str) -> Dict[str, Any]:
+    """Mint receipt carrying the metadata URI until the user's transactions confirm."""
+    return MintReceipt(
+        tx_hash="", # Will be filled after user confirms transactions
+        token_id="", # Will be extracted from mint transaction receipt
+        token_uri=metadata_cid
+    ).model_dump(mode="json")
+
+
+def _direct_mint_response(
+    metadata: Dict[str, Any],
+    metadata_cid: str,
+    winner_cid: str,
+    prepared_tx_obj: MCPPreparedTx,
+    all_messages: List[AgentMessage],
+    message: str,
+    reason: str
+) -> Dict[str, Any]:
+    """
+    Build the finalize_mint result for a vote that needs no close transaction.
+    
+    Used both when the MCP server reports the vote already closed ("direct") and when
+    preparing the close transaction failed and the vote is assumed closed ("fallback").
+    """
+    all_messages.append(_msg("info", message, links=_mint_links(metadata_cid, winner_cid)))
+    
+    logger.debug("🪙 MINT: Set finalize_mint checkpoint (%s) with metadata %s", reason, metadata_cid)
+    
+    return {
+        "mint": _pending_receipt(metadata_cid),
+        "prepared_tx": _tx_dict(prepared_tx_obj),
+        "metadata": metadata, # Include for preview in frontend
+        "checkpoint": "finalize_mint",
+        "messages": all_messages
+    }
+
 
 async def mint_agent(state: RunState) -> Dict[str, Any]:
     """
@@ -29,74 +120,44 @@ async def mint_agent(state: RunState) -> Dict[str, Any]:
     if not lore:
         return {
             "error": "Missing lore data for mint",
-            "messages": [{
-                "agent": "Mint",
-                "level": "error", 
-                "message": "❌ Cannot mint without lore research data",
-                "ts": str(uuid.uuid4())
-            }]
+            "messages": [_msg("error", "❌ Cannot mint without lore research data")]
         }
         
     if not vote or not vote.get("result"):
         return {
             "error": "Missing vote result for mint",
-            "messages": [{
-                "agent": "Mint",
-                "level": "error",
-                "message": "❌ Cannot mint without completed vote results", 
-                "ts": str(uuid.uuid4())
-            }]
+            "messages": [_msg("error", "❌ Cannot mint without completed vote results")]
         }
         
     if not art or not art.get("cids"):
         return {
             "error": "Missing art data for mint",
-            "messages": [{
-                "agent": "Mint", 
-                "level": "error",
-                "message": "❌ Cannot mint without generated art CIDs",
-                "ts": str(uuid.uuid4())
-            }]
+            "messages": [_msg("error", "❌ Cannot mint without generated art CIDs")]
         }
     
     winner_cid = vote["result"]["winner_cid"]
     
     try:
+        # Messages for the workflow to merge; progress already streamed to the run isn't repeated here
         all_messages = []
         
         # Step 1: Build complete NFT metadata per schema
-        start_message = {
-            "agent": "Mint",
-            "level": "info", 
-            "message": "📋 Building NFT metadata from workflow state...",
-            "ts": str(uuid.uuid4())
-        }
-        all_messages.append(start_message)
-        
-        # Update SSE immediately
-        if run_id:
-            current_messages = simple_state.get_run_state(run_id).get("messages", [])
-            current_messages.append(start_message)
-            simple_state.update_run_state(run_id, {"messages": current_messages})
-        
-        # Convert IPFS URL to HTTP gateway URL for better explorer compatibility
-        def ipfs_to_http(cid: str) -> str:
-            if cid.startswith('ipfs://'):
-                hash_part = cid[7:]  # Remove 'ipfs://' prefix
-                return f"https://ipfs.io/ipfs/{hash_part}"
-            return f"https://ipfs.io/ipfs/{cid}"
+        stream_progress(run_id, all_messages, _msg("info", "📋 Building NFT metadata from workflow state..."))
         
         metadata = {
             "name": f"{lore.get('title', state['date_label'])} — {state['date_label']}",
-            "description": f"Commemorative NFT capturing the historical significance of {state['date_label']}. {lore['summary_md'][:200]}{'...' if len(lore['summary_md']) > 200 else ''}",
+            "description": f"Commemorative NFT capturing the historical significance of {state['date_label']}. {_truncate(lore['summary_md'], 200)}",
             "image": ipfs_to_http(winner_cid),
             "attributes": [
-                {"trait_type": "Date", "value": state["date_label"]},
-                {"trait_type": "Winner CID", "value": winner_cid},
-                {"trait_type": "Sources", "value": len(lore["sources"])},
-                {"trait_type": "Art Style", "value": lore["prompt_seed"].get("style", "Historical")},
-                {"trait_type": "Participation", "value": vote["result"].get("participation", 0)},
-                {"trait_type": "Voting Method", "value": "Blockchain Democracy"}
+                {"trait_type": trait_type, "value": value}
+                for trait_type, value in zip(_TRAIT_TYPES, (
+                    state["date_label"],
+                    winner_cid,
+                    len(lore["sources"]),
+                    lore["prompt_seed"].get("style", "Historical"),
+                    vote["result"].get("participation", 0),
+                    "Blockchain Democracy"
+                ))
             ],
             "properties": {
                 "summary_md": lore["summary_md"],
@@ -113,216 +174,105 @@ async def mint_agent(state: RunState) -> Dict[str, Any]:
             }
         }
         
-        print(f"🪙 MINT: Built metadata - name: '{metadata['name'][:50]}...', attrs: {len(metadata['attributes'])}")
+        logger.debug("🪙 MINT: Built metadata - name: '%s...', attrs: %s", metadata['name'][:50], len(metadata['attributes']))
         
         # Step 2: Pin metadata to IPFS via MCP
-        pin_message = {
-            "agent": "Mint",
-            "level": "info",
-            "message": "📌 Pinning metadata to IPFS...",
-            "ts": str(uuid.uuid4())
-        }
-        all_messages.append(pin_message)
-        
-        # Update SSE
-        if run_id:
-            current_messages = simple_state.get_run_state(run_id).get("messages", [])
-            current_messages.append(pin_message)
-            simple_state.update_run_state(run_id, {"messages": current_messages})
+        stream_progress(run_id, all_messages, _msg("info", "📌 Pinning metadata to IPFS..."))
         
         mcp_client = get_mcp_client()
         pin_result = await mcp_client.pin_metadata(metadata)
         metadata_cid = pin_result.cid
         
-        print(f"🪙 MINT: Metadata pinned to {metadata_cid}")
+        logger.debug("🪙 MINT: Metadata pinned to %s", metadata_cid)
         
         # Step 3: Prepare mint transaction via MCP
-        tx_message = {
-            "agent": "Mint",
-            "level": "info",
-            "message": f"⚙️ Preparing mint transaction with metadata {metadata_cid[:20]}...",
-            "ts": str(uuid.uuid4())
-        }
-        all_messages.append(tx_message)
-        
-        # Update SSE
-        if run_id:
-            current_messages = simple_state.get_run_state(run_id).get("messages", [])
-            current_messages.append(tx_message)
-            simple_state.update_run_state(run_id, {"messages": current_messages})
+        stream_progress(run_id, all_messages, _msg("info", f"⚙️ Preparing mint transaction with metadata {metadata_cid[:20]}..."))
         
         # Get the vote ID from state
         vote_id = vote.get("id")
-        print(f"🪙 MINT: Raw vote object from state: {vote}")
-        print(f"🪙 MINT: Extracted vote ID: {vote_id}")
+        logger.debug("🪙 MINT: Raw vote object from state: %s", vote)
+        logger.debug("🪙 MINT: Extracted vote ID: %s", vote_id)
         
         if not vote_id:
             raise Exception("Vote ID missing from state - cannot prepare mint transaction")
         
-        if vote_id == "0x" + "0" * 64:
+        if vote_id == _ZERO_VOTE_ID:
             raise Exception(f"Vote ID is still fake/zero: {vote_id} - real vote ID not propagated!")
         
-        print(f"🪙 MINT: ✅ Using REAL vote ID: {vote_id}")
+        logger.debug("🪙 MINT: ✅ Using REAL vote ID: %s", vote_id)
+        
+        # Closing the vote and preparing the mint are independent MCP round trips, so start both now;
+        # every branch below reuses the mint task's result instead of issuing another call
+        close_vote_task = asyncio.create_task(mcp_client.create_close_vote_transaction(vote_id))
+        mint_tx_task = asyncio.create_task(mcp_client.create_mint_transaction(vote_id, winner_cid, metadata_cid))
         
-        # Step 3a: First, check if we need to close the vote
+        # Step 3a: First, check if we need to close the vote (only this call's failure means "assume closed")
         try:
-            close_vote_response = await mcp_client.create_close_vote_transaction(vote_id)
-            
-            # Check if MCP server says vote is already closed
-            if isinstance(close_vote_response, dict) and close_vote_response.get('skip_close'):
-                print(f"🪙 MINT: Vote already closed, skipping close vote step")
-                # Go directly to mint transaction - no close vote needed
-                prepared_tx_obj = await mcp_client.create_mint_transaction(vote_id, winner_cid, metadata_cid)
-                prepared_tx_obj.gas = max(prepared_tx_obj.gas or 100000, 200000)
-                
-                print(f"🪙 MINT: Mint transaction prepared directly - gas: {prepared_tx_obj.gas}")
-                
-                # Prepare mint receipt with metadata info
-                mint_receipt = MintReceipt(
-                    tx_hash="", # Will be filled after user confirms transaction
-                    token_id="", # Will be extracted from transaction receipt
-                    token_uri=metadata_cid
-                )
-                
-                # Go straight to finalize_mint checkpoint
-                checkpoint_message = {
-                    "agent": "Mint",
-                    "level": "info",
-                    "message": "🎯 Vote already closed! Ready to mint NFT directly.",
-                    "ts": str(uuid.uuid4()),
-                    "links": [
-                        {"label": "Metadata Preview", "href": metadata_cid},
-                        {"label": "Winner Art", "href": winner_cid}
-                    ]
-                }
-                all_messages.append(checkpoint_message)
-                
-                print(f"🪙 MINT: Set finalize_mint checkpoint (direct) with metadata {metadata_cid}")
-                
-                return {
-                    "mint": mint_receipt.dict(),
-                    "prepared_tx": {
-                        "to": prepared_tx_obj.to,
-                        "data": prepared_tx_obj.data,
-                        "value": prepared_tx_obj.value,
-                        "gas": prepared_tx_obj.gas
-                    },
-                    "metadata": metadata, # Include for preview in frontend
-                    "checkpoint": "finalize_mint",
-                    "messages": all_messages
-                }
-            
-            # Normal case: close vote transaction needed
-            close_vote_tx = close_vote_response
-            
-            # Ensure adequate gas for close vote (needs more due to winner calculation loop)
-            if close_vote_tx.gas:
-                close_vote_tx.gas = max(close_vote_tx.gas, 300000)
-            else:
-                close_vote_tx.gas = 300000
-                
-            print(f"🪙 MINT: Close vote transaction prepared - gas: {close_vote_tx.gas}")
-            
+            close_vote_response = await close_vote_task
         except Exception as close_vote_error:
-            print(f"🪙 MINT: Error preparing close vote: {close_vote_error}")
+            logger.warning("🪙 MINT: Error preparing close vote: %s", close_vote_error)
             # Fallback: assume vote is already closed, go directly to mint
-            print(f"🪙 MINT: Assuming vote already closed, proceeding to mint")
-            prepared_tx_obj = await mcp_client.create_mint_transaction(vote_id, winner_cid, metadata_cid)
-            prepared_tx_obj.gas = max(prepared_tx_obj.gas or 100000, 200000)
-            
-            # Prepare mint receipt with metadata info
-            mint_receipt = MintReceipt(
-                tx_hash="", # Will be filled after user confirms transaction
-                token_id="", # Will be extracted from transaction receipt
-                token_uri=metadata_cid
+            logger.debug("🪙 MINT: Assuming vote already closed, proceeding to mint")
+            prepared_tx_obj = _with_gas_floor(await mint_tx_task, MINT_GAS_FLOOR)
+            return _direct_mint_response(
+                metadata, metadata_cid, winner_cid, prepared_tx_obj, all_messages,
+                "🎯 Vote appears closed! Ready to mint NFT directly.", "fallback"
             )
+        
+        # Check if MCP server says vote is already closed
+        if isinstance(close_vote_response, dict) and close_vote_response.get('skip_close'):
+            logger.debug("🪙 MINT: Vote already closed, skipping close vote step")
+            # Go directly to mint transaction - no close vote needed
+            prepared_tx_obj = _with_gas_floor(await mint_tx_task, MINT_GAS_FLOOR)
             
-            checkpoint_message = {
-                "agent": "Mint",
-                "level": "info",
-                "message": "🎯 Vote appears closed! Ready to mint NFT directly.",
-                "ts": str(uuid.uuid4()),
-                "links": [
-                    {"label": "Metadata Preview", "href": metadata_cid},
-                    {"label": "Winner Art", "href": winner_cid}
-                ]
-            }
-            all_messages.append(checkpoint_message)
-            
-            print(f"🪙 MINT: Set finalize_mint checkpoint (fallback) with metadata {metadata_cid}")
+            logger.debug("🪙 MINT: Mint transaction prepared directly - gas: %s", prepared_tx_obj.gas)
             
-            return {
-                "mint": mint_receipt.dict(),
-                "prepared_tx": {
-                    "to": prepared_tx_obj.to,
-                    "data": prepared_tx_obj.data,
-                    "value": prepared_tx_obj.value,
-                    "gas": prepared_tx_obj.gas
-                },
-                "metadata": metadata, # Include for preview in frontend
-                "checkpoint": "finalize_mint",
-                "messages": all_messages
-            }
+            # Go straight to finalize_mint checkpoint
+            return _direct_mint_response(
+                metadata, metadata_cid, winner_cid, prepared_tx_obj, all_messages,
+                "🎯 Vote already closed! Ready to mint NFT directly.", "direct"
+            )
         
-        # Step 3b: Then, prepare the mint transaction (for after close vote)
-        prepared_tx_obj = await mcp_client.create_mint_transaction(vote_id, winner_cid, metadata_cid)
+        # Normal case: close vote transaction needed
+        # Ensure adequate gas for close vote (needs more due to winner calculation loop)
+        close_vote_tx = _with_gas_floor(close_vote_response, CLOSE_VOTE_GAS_FLOOR)
         
-
+        logger.debug("🪙 MINT: Close vote transaction prepared - gas: %s", close_vote_tx.gas)
         
-        print(f"🪙 MINT: Mint transaction prepared - to: {prepared_tx_obj.to}, gas: {prepared_tx_obj.gas or 'auto'}")
+        # Step 3b: Then, collect the mint transaction (for after close vote)
+        prepared_tx_obj = await mint_tx_task
         
-        # Step 4: Set close_vote checkpoint for user confirmation (first step)
-        checkpoint_message = {
-            "agent": "Mint",
-            "level": "info",
-            "message": "🔐 Ready to close vote and mint NFT! First, we need to close the vote on-chain.",
-            "ts": str(uuid.uuid4()),
-            "links": [
-                {"label": "Metadata Preview", "href": metadata_cid},
-                {"label": "Winner Art", "href": winner_cid}
-            ]
-        }
-        all_messages.append(checkpoint_message)
+        logger.debug("🪙 MINT: Mint transaction prepared - to: %s, gas: %s", prepared_tx_obj.to, prepared_tx_obj.gas or 'auto')
         
-        # Prepare mint receipt with metadata info
-        mint_receipt = MintReceipt(
-            tx_hash="", # Will be filled after user confirms transactions
-            token_id="", # Will be extracted from mint transaction receipt
-            token_uri=metadata_cid
-        )
+        # Step 4: Set close_vote checkpoint for user confirmation (first step)
+        all_messages.append(_msg(
+            "info",
+            "🔐 Ready to close vote and mint NFT! First, we need to close the vote on-chain.",
+            links=_mint_links(metadata_cid, winner_cid)
+        ))
         
-        print(f"🪙 MINT: Set close_vote checkpoint with metadata {metadata_cid}")
+        logger.debug("🪙 MINT: Set close_vote checkpoint with metadata %s", metadata_cid)
         
         return {
-            "mint": mint_receipt.dict(),
-            "prepared_tx": {
-                "to": close_vote_tx.to,
-                "data": close_vote_tx.data,
-                "value": close_vote_tx.value,
-                "gas": close_vote_tx.gas
-            },
-            "mint_tx": {  # Store mint transaction for second step
-                "to": prepared_tx_obj.to,
-                "data": prepared_tx_obj.data,
-                "value": prepared_tx_obj.value,
-                "gas": prepared_tx_obj.gas
-            },
+            "mint": _pending_receipt(metadata_cid),
+            "prepared_tx": _tx_dict(close_vote_tx),
+            "mint_tx": _tx_dict(prepared_tx_obj),  # Store mint transaction for second step
             "metadata": metadata, # Include for preview in frontend
             "checkpoint": "close_vote",
             "messages": all_messages
         }
         
     except Exception as e:
-        error_message = {
-            "agent": "Mint",
-            "level": "error",
-            "message": f"❌ Mint preparation failed: {str(e)}",
-            "ts": str(uuid.uuid4())
-        }
+        error_message = _msg("error", f"❌ Mint preparation failed: {str(e)}")
         
-        print(f"🪙 MINT: ERROR - {str(e)}")
+        logger.error("🪙 MINT: ERROR - %s", e)
         
         return {
             "error": f"Mint preparation failed: {str(e)}",
             "messages": [error_message]
-        }
\ No newline at end of file
+        }
+    
+    finally:
+        if run_id:
+            # Queued progress must land before the workflow merges our messages
+            simple_state.message_buffer.flush(run_id)
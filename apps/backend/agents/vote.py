@@ -1,14 +1,33 @@
 """
 Vote Agent - Handle voting via MCP tools with real blockchain integration
 """
-import uuid
 import asyncio
+import functools
+import logging
+import time
 from typing import Dict, Any
-from datetime import datetime
 import simple_state
 from state import RunState, VoteConfig, VoteState, PreparedTx, VoteResult
+from messages import agent_message, numbered_links, stream_progress
 from services.mcp_client import get_mcp_client, VoteStatus, TallyResult
 
+logger = logging.getLogger(__name__)
+
+
+# Tally polling (seconds): start fast, back off while the tally is idle, report progress at least
+# every 30s, and give up after the 120s vote plus a 30s buffer
+POLL_INTERVAL_MIN = 0.5
+POLL_INTERVAL_MAX = 5.0
+POLL_TIMEOUT = 150.0
+PROGRESS_INTERVAL = 30.0
+# A status polled this recently is reused as the final status instead of fetching it again
+STATUS_REUSE_WINDOW = 1.0
+# Open votes that already have ballots are tallied once we've polled this long
+SMART_COMPLETION_AFTER = 60.0
+
+# Messages from this agent: _msg(level, message, **extra)
+_msg = functools.partial(agent_message, "Vote")
+
 
 async def vote_agent(state: RunState) -> Dict[str, Any]:
     """
@@ -23,21 +42,13 @@ async def vote_agent(state: RunState) -> Dict[str, Any]:
     art = state.get("art")
     
     if not art or not art.get("cids"):
-        error_message = {
-            "agent": "Vote",
-            "level": "error",
-            "message": "No art data available for voting",
-            "ts": str(uuid.uuid4())
-        }
+        error_message = _msg("error", "No art data available for voting")
         return {
             "error": "No art data available for voting",
             "messages": [error_message]
         }
     
     try:
-        # Small delay for SSE streaming
-        await asyncio.sleep(0.05)
-        
         # Get MCP client for real blockchain integration
         mcp_client = get_mcp_client()
         
@@ -51,16 +62,16 @@ async def vote_agent(state: RunState) -> Dict[str, Any]:
             duration_s=120  # 2 minutes for realistic demo timing
         )
         
-        print(f"🗳️ VOTE: Starting real blockchain vote for {run_id}")
-        print(f"🗳️ VOTE: Art options: {len(art_cids)} CIDs")
-        print(f"🗳️ VOTE: Config: {vote_config.dict()}")
+        logger.debug("🗳️ VOTE: Starting real blockchain vote for %s", run_id)
+        logger.debug("🗳️ VOTE: Art options: %s CIDs", len(art_cids))
+        logger.debug("🗳️ VOTE: Config: %s", vote_config)
         
         # ✅ REAL MCP INTEGRATION: Call start_vote
         vote_id, prepared_tx = await mcp_client.start_vote(art_cids, vote_config)
         
-        print(f"🗳️ VOTE: Real vote created with ID: {vote_id}")
-        print(f"🗳️ VOTE: PreparedTx ready for wallet signing")
-        print(f"🗳️ VOTE: MCP returned gas limit: {getattr(prepared_tx, 'gas', 'None')}")
+        logger.debug("🗳️ VOTE: Real vote created with ID: %s", vote_id)
+        logger.debug("🗳️ VOTE: PreparedTx ready for wallet signing")
+        logger.debug("🗳️ VOTE: MCP returned gas limit: %s", getattr(prepared_tx, 'gas', 'None'))
         
         # Create VoteState with real blockchain data
         vote_state = VoteState(
@@ -70,16 +81,11 @@ async def vote_agent(state: RunState) -> Dict[str, Any]:
         )
         
         # Create success message with voting options
-        start_message = {
-            "agent": "Vote",
-            "level": "info", 
-            "message": f"🗳️ Created blockchain vote {vote_id} with {len(art_cids)} options - Please confirm transaction",
-            "ts": str(uuid.uuid4()),
-            "links": [
-                {"label": f"Option {i+1}", "href": cid}
-                for i, cid in enumerate(art_cids)
-            ]
-        }
+        start_message = _msg(
+            "info",
+            f"🗳️ Created blockchain vote {vote_id} with {len(art_cids)} options - Please confirm transaction",
+            links=numbered_links("Option {}", art_cids)
+        )
         
         # ✅ CHECKPOINT: Add vote_tx_approval for user transaction confirmation
         prepared_tx_obj = PreparedTx(
@@ -89,28 +95,25 @@ async def vote_agent(state: RunState) -> Dict[str, Any]:
             gas=max(prepared_tx.gas if hasattr(prepared_tx, 'gas') and prepared_tx.gas else 0, 500000)
         )
         
-        print(f"🗳️ VOTE: PreparedTx object: {prepared_tx_obj.dict()}")
-        print(f"🗳️ VOTE: Vote state: {vote_state.dict()}")
+        # Dump each model once, for the log and the state update alike
+        prepared_tx_dict = prepared_tx_obj.model_dump(mode="json")
+        vote_state_dict = vote_state.model_dump(mode="json")
+        logger.debug("🗳️ VOTE: PreparedTx object: %s", prepared_tx_dict)
+        logger.debug("🗳️ VOTE: Vote state: %s", vote_state_dict)
         
         result = {
-            "vote": vote_state.dict(),
-            "prepared_tx": prepared_tx_obj.dict(),
+            "vote": vote_state_dict,
+            "prepared_tx": prepared_tx_dict,
             "checkpoint": "vote_tx_approval",  # ✅ NEW CHECKPOINT
             "messages": [start_message]
         }
         
-        print(f"🗳️ VOTE: Full result being returned: {result}")
         return result
         
     except Exception as e:
-        print(f"🗳️ VOTE: Failed to create vote: {e}")
+        logger.error("🗳️ VOTE: Failed to create vote: %s", e)
         
-        error_message = {
-                "agent": "Vote",
-                "level": "error",
-                "message": f"Vote creation failed: {str(e)}",
-                "ts": str(uuid.uuid4())
-        }
+        error_message = _msg("error", f"Vote creation failed: {str(e)}")
         
         return {
             "error": f"Vote creation failed: {str(e)}",
@@ -135,12 +138,7 @@ async def tally_vote_agent(state: RunState) -> Dict[str, Any]:
     if not vote or not art:
         return {
             "error": "Missing vote or art data for tally",
-            "messages": [{
-                "agent": "Vote", 
-                "level": "error",
-                "message": "Missing data for vote tally",
-                "ts": str(uuid.uuid4())
-            }]
+            "messages": [_msg("error", "Missing data for vote tally")]
         }
     
     # ✅ PHASE 5.5.3: Real-time MCP Polling with Timeout Fallback
@@ -149,12 +147,7 @@ async def tally_vote_agent(state: RunState) -> Dict[str, Any]:
     vote_id = vote.get("id")
     
     if not vote_id:
-        error_message = {
-            "agent": "Vote",
-            "level": "error", 
-            "message": "Vote ID missing from state",
-            "ts": str(uuid.uuid4())
-        }
+        error_message = _msg("error", "Vote ID missing from state")
         return {
             "error": "Vote ID missing",
             "messages": [error_message]
@@ -162,119 +155,101 @@ async def tally_vote_agent(state: RunState) -> Dict[str, Any]:
         
     try:
         mcp_client = get_mcp_client()
+        # Messages for the workflow to merge; progress already streamed to the run isn't repeated here
         all_messages = []
         
         # Start polling message
-        start_message = {
-            "agent": "Vote",
-            "level": "info",
-            "message": f"🕐 Starting vote polling for {vote_id[:16]}... (5s intervals)",
-            "ts": str(uuid.uuid4())
-        }
-        all_messages.append(start_message)
-        
-        # Update SSE immediately
-        if run_id:
-            current_messages = simple_state.get_run_state(run_id).get("messages", [])
-            current_messages.append(start_message)
-            simple_state.update_run_state(run_id, {"messages": current_messages})
+        stream_progress(run_id, all_messages, _msg("info", f"🕐 Starting vote polling for {vote_id[:16]}... (adaptive intervals)"))
         
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + POLL_TIMEOUT
+        last_status = None
+        last_status_at = 0.0
         poll_count = 0
-        max_polls = 30   # 30 polls * 5s = 150 seconds timeout (120s vote + 30s buffer)
         
-        while poll_count < max_polls:
+        while loop.time() < deadline:
             poll_count += 1
             
-            # Get current vote status
+            # Wait for the vote to close, expire or move (returns at least every 30s)
             try:
-                vote_status: VoteStatus = await mcp_client.get_vote_status(vote_id)
-                print(f"📊 TALLY: Poll #{poll_count}: open={vote_status.open}, tallies={vote_status.tallies}, ends_at={vote_status.ends_at}")
+                vote_status: VoteStatus = await mcp_client.wait_for_vote_change(
+                    vote_id, last_status,
+                    timeout=min(PROGRESS_INTERVAL, deadline - loop.time()),
+                    min_interval=POLL_INTERVAL_MIN, max_interval=POLL_INTERVAL_MAX
+                )
+                first_status = last_status is None
+                last_status, last_status_at = vote_status, loop.time()
+                logger.debug("📊 TALLY: Update #%s: open=%s, tallies=%s, ends_at=%s", poll_count, vote_status.open, vote_status.tallies, vote_status.ends_at)
                 
                 # Check if vote has ended naturally
                 if not vote_status.open:
-                    print(f"📊 TALLY: Vote {vote_id} has ended naturally")
+                    logger.debug("📊 TALLY: Vote %s has ended naturally", vote_id)
                     break
                 
-                # Check timeout - parse ends_at timestamp (handle both int and ISO string)
+                # Check timeout
                 try:
-                    if isinstance(vote_status.ends_at, str):
-                        # Handle ISO 8601 format: "2025-08-24T18:00:58.000Z"
-                        from datetime import datetime
-                        if vote_status.ends_at.endswith('Z'):
-                            # Remove 'Z' and parse
-                            ends_at_dt = datetime.fromisoformat(vote_status.ends_at.replace('Z', '+00:00'))
-                        else:
-                            ends_at_dt = datetime.fromisoformat(vote_status.ends_at)
-                        ends_at_timestamp = int(ends_at_dt.timestamp())
-                    else:
-                        # Handle integer timestamp
-                        ends_at_timestamp = int(vote_status.ends_at)
-                        
-                    current_timestamp = int(datetime.now().timestamp())
-                    
-                    if current_timestamp >= ends_at_timestamp:
-                        print(f"📊 TALLY: Vote {vote_id} has expired (timeout)")
+                    if time.time() >= vote_status.ends_at_timestamp():
+                        logger.debug("📊 TALLY: Vote %s has expired (timeout)", vote_id)
                         break
                         
                 except (ValueError, TypeError) as e:
-                    print(f"📊 TALLY: Warning - could not parse ends_at timestamp: {e}")
+                    logger.warning("📊 TALLY: Warning - could not parse ends_at timestamp: %s", e)
                     # Continue polling if timestamp parsing fails
                 
-                # Send progress update every 6 polls (30s intervals)
-                if poll_count % 6 == 0:
-                    progress_message = {
-                        "agent": "Vote",
-                        "level": "info",
-                        "message": f"📊 Vote in progress... ({poll_count}/{max_polls} polls, tallies: {vote_status.tallies})",
-                        "ts": str(uuid.uuid4())
-                    }
-                    all_messages.append(progress_message)
-                    
-                    # Update SSE
-                    if run_id:
-                        current_messages = simple_state.get_run_state(run_id).get("messages", [])
-                        current_messages.append(progress_message)
-                        simple_state.update_run_state(run_id, {"messages": current_messages})
-                
-                # Wait 5 seconds before next poll
-                await asyncio.sleep(5.0)
+                # Send a progress update on each return after the first (new votes, or 30s without any)
+                if not first_status:
+                    stream_progress(run_id, all_messages, _msg("info", f"📊 Vote in progress... ({loop.time() - started:.0f}s elapsed, tallies: {vote_status.tallies})"))
                 
             except Exception as poll_error:
-                print(f"📊 TALLY: Polling error on attempt {poll_count}: {poll_error}")
+                logger.warning("📊 TALLY: Polling error on attempt %s: %s", poll_count, poll_error)
                 
                 # If polling fails, wait and try again (don't break immediately)
-                if poll_count < max_polls:
-                    await asyncio.sleep(5.0)
-                    continue
-                else:
-                    print(f"📊 TALLY: Max polling errors reached, triggering fallback")
-                    break
+                await asyncio.sleep(min(POLL_INTERVAL_MAX, max(0.0, deadline - loop.time())))
+        else:
+            logger.debug("📊 TALLY: Polling timed out after %s polls, triggering fallback", poll_count)
+        
+        # Progress must land before the workflow merges the completion message
+        if run_id:
+            simple_state.message_buffer.flush(run_id)
         
         # Determine completion type
         vote_ended_naturally = False
         has_votes = False
+        tally_prefetch = None
         
         try:
-            final_status: VoteStatus = await mcp_client.get_vote_status(vote_id)
+            # The loop usually exits right after a poll, so reuse that status rather than asking again
+            if last_status is not None and loop.time() - last_status_at < STATUS_REUSE_WINDOW:
+                final_status: VoteStatus = last_status
+            else:
+                # tally_vote only reads the contract, so fetch it alongside the status in case the vote is done
+                final_status, tally_prefetch = await asyncio.gather(
+                    mcp_client.get_vote_status(vote_id), mcp_client.tally_vote(vote_id), return_exceptions=True
+                )
+                if isinstance(final_status, BaseException):
+                    raise final_status
             vote_ended_naturally = not final_status.open
             
             # Check if there are any votes cast (even if vote is still open)
             has_votes = final_status.tallies and any(count > 0 for count in final_status.tallies)
             
             # Smart completion: if votes exist and we've polled enough, treat as naturally ready
-            if not vote_ended_naturally and has_votes and poll_count >= 12:  # At least 60 seconds of polling
-                print(f"📊 TALLY: Smart completion - votes exist {final_status.tallies}, treating as ready")
+            if not vote_ended_naturally and has_votes and loop.time() - started >= SMART_COMPLETION_AFTER:
+                logger.debug("📊 TALLY: Smart completion - votes exist %s, treating as ready", final_status.tallies)
                 vote_ended_naturally = True
                 
         except:
-            print("📊 TALLY: Could not get final status, assuming timeout")
+            logger.warning("📊 TALLY: Could not get final status, assuming timeout")
         
         if vote_ended_naturally:
             # Vote completed naturally - get official results via tally_vote
-            print(f"📊 TALLY: Getting official results via MCP tally_vote")
+            logger.debug("📊 TALLY: Getting official results via MCP tally_vote")
             
             try:
-                tally_result: TallyResult = await mcp_client.tally_vote(vote_id)
+                tally_result: TallyResult = tally_prefetch if tally_prefetch is not None else await mcp_client.tally_vote(vote_id)
+                if isinstance(tally_result, BaseException):
+                    raise tally_result
                 
                 # Create VoteResult from MCP response
                 vote_result = VoteResult(
@@ -283,16 +258,13 @@ async def tally_vote_agent(state: RunState) -> Dict[str, Any]:
                     participation=sum(tally_result.tally.values()) if tally_result.tally else 0
                 )
                 
-                completion_message = {
-                    "agent": "Vote",
-                    "level": "success",
-                    "message": f"🎉 Vote completed! Winner: {tally_result.winner_cid[:16]}... (natural completion)",
-                    "ts": str(uuid.uuid4()),
-                    "links": [{"label": "Winner Art", "href": tally_result.winner_cid}]
-                }
+                completion_message = _msg(
+                    "success", f"🎉 Vote completed! Winner: {tally_result.winner_cid[:16]}... (natural completion)",
+                    links=[{"label": "Winner Art", "href": tally_result.winner_cid}]
+                )
                 
             except Exception as tally_error:
-                print(f"📊 TALLY: MCP tally_vote failed: {tally_error}, using fallback")
+                logger.warning("📊 TALLY: MCP tally_vote failed: %s, using fallback", tally_error)
                 
                 # Fallback even for natural completion
                 winner_cid = art["cids"][0]
@@ -302,17 +274,14 @@ async def tally_vote_agent(state: RunState) -> Dict[str, Any]:
                     participation=1
                 )
                 
-                completion_message = {
-                    "agent": "Vote", 
-                    "level": "warning",
-                    "message": f"🎉 Vote completed with fallback! Winner: {winner_cid[:16]}... (MCP tally failed)",
-                    "ts": str(uuid.uuid4()),
-                    "links": [{"label": "Winner Art", "href": winner_cid}]
-                }
+                completion_message = _msg(
+                    "warning", f"🎉 Vote completed with fallback! Winner: {winner_cid[:16]}... (MCP tally failed)",
+                    links=[{"label": "Winner Art", "href": winner_cid}]
+                )
                 
         else:
             # Vote timed out - use fallback logic
-            print(f"📊 TALLY: Vote timed out after {poll_count} polls, using fallback (index 0)")
+            logger.debug("📊 TALLY: Vote timed out after %s polls, using fallback (index 0)", poll_count)
             
             winner_cid = art["cids"][0]  # Pick index 0 as per requirements
             vote_result = VoteResult(
@@ -321,23 +290,20 @@ async def tally_vote_agent(state: RunState) -> Dict[str, Any]:
                 participation=1
             )
             
-            completion_message = {
-                "agent": "Vote",
-                "level": "warning", 
-                "message": f"⏱️ Vote timed out! Winner by fallback: {winner_cid[:16]}... (picked index 0)",
-                "ts": str(uuid.uuid4()),
-                "links": [{"label": "Winner Art", "href": winner_cid}]
-            }
+            completion_message = _msg(
+                "warning", f"⏱️ Vote timed out! Winner by fallback: {winner_cid[:16]}... (picked index 0)",
+                links=[{"label": "Winner Art", "href": winner_cid}]
+            )
         
         all_messages.append(completion_message)
         
         # Update vote state with results
         updated_vote = vote.copy()
-        updated_vote["result"] = vote_result.dict()
+        updated_vote["result"] = vote_result.model_dump(mode="json")
         if not vote_ended_naturally:
             updated_vote["fallback"] = True  # Mark fallback completion
         
-        print(f"📊 TALLY: Completed vote {vote_id} - winner: {vote_result.winner_cid}")
+        logger.debug("📊 TALLY: Completed vote %s - winner: %s", vote_id, vote_result.winner_cid)
         
         return {
             "vote": updated_vote,
@@ -345,17 +311,14 @@ async def tally_vote_agent(state: RunState) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        print(f"📊 TALLY: Fatal error in tally_vote_agent: {e}")
+        logger.error("📊 TALLY: Fatal error in tally_vote_agent: %s", e)
+        if run_id:
+            simple_state.message_buffer.flush(run_id)
         
         # Emergency fallback
         winner_cid = art["cids"][0] if art.get("cids") else "unknown"
         
-        error_message = {
-                "agent": "Vote",
-                "level": "error", 
-            "message": f"❌ Vote tally failed: {str(e)}. Emergency fallback: {winner_cid[:16]}...",
-                "ts": str(uuid.uuid4())
-        }
+        error_message = _msg("error", f"❌ Vote tally failed: {str(e)}. Emergency fallback: {winner_cid[:16]}...")
         
         # Create minimal vote result
         emergency_vote_result = VoteResult(
@@ -365,7 +328,7 @@ async def tally_vote_agent(state: RunState) -> Dict[str, Any]:
         )
         
         updated_vote = vote.copy() if vote else {}
-        updated_vote["result"] = emergency_vote_result.dict()
+        updated_vote["result"] = emergency_vote_result.model_dump(mode="json")
         updated_vote["fallback"] = True
         updated_vote["error"] = str(e)
         
@@ -4,7 +4,10 @@ FastAPI + LangGraph Backend Orchestrator
 Implements REST endpoints and SSE streaming for the Attested History project.
 """
 import asyncio
+import itertools
 import json
+import logging
+import os
 import uuid
 from typing import AsyncGenerator, Dict, Any
 from contextlib import asynccontextmanager
@@ -14,7 +17,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 
@@ -26,8 +29,33 @@ from agents.lore import lore_agent
 from agents.artist import artist_agent
 from agents.vote import vote_agent, tally_vote_agent
 from agents.mint import mint_agent
+from services import get_mcp_client
 import simple_state
 
+try:
+    # Rust JSON serializer for SSE payloads, endpoint responses and per-poll state comparison
+    import orjson
+except ImportError:
+    orjson = None
+
+# Workflow and SSE diagnostics go through logging; LOG_LEVEL=debug shows the per-node and per-poll detail
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "info").upper(), format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize an SSE data payload."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj)
+
+
+def _fingerprint(value: Any) -> bytes:
+    """Canonical serialization of a state value for change detection."""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, sort_keys=True, default=str).encode()
+
 
 # Request/Response models
 class CreateRunRequest(BaseModel):
@@ -61,14 +89,20 @@ async def lifespan(app: FastAPI):
         workflow = create_workflow(checkpointer)
         workflows["main"] = workflow
         
-        yield
+        try:
+            yield
+        finally:
+            # Release the MCP client's pooled connections, even if shutdown fails
+            await get_mcp_client().aclose()
 
 
 app = FastAPI(
     title="Attested History Backend",
     description="LangGraph orchestrator for multi-agent NFT curation",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # Run state responses carry the full lore pack and art set, so encode them with orjson when available
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse
 )
 
 
@@ -132,59 +166,57 @@ async def start_workflow(run_id: str, initial_state: RunState):
     """Start workflow execution with real-time streaming"""
     try:
         workflow = workflows["main"]
-        print(f"Starting workflow {run_id} with state: {initial_state}")
+        logger.debug("Starting workflow %s with state: %s", run_id, initial_state)
         
         # Store initial state
         simple_state.store_run_state(run_id, initial_state)
         
         # SSE polling is ultra-fast (10ms), no startup delay needed
-        print(f"Starting workflow immediately for {run_id}...")
+        logger.debug("Starting workflow immediately for %s...", run_id)
         
         # Run workflow with streaming - use "values" mode to get accumulated state after each node
-        print(f"Streaming workflow for {run_id}...")
+        logger.debug("Streaming workflow for %s...", run_id)
         
         # Create config for checkpointer with thread_id
         config = {"configurable": {"thread_id": run_id}}
         
         async for chunk in workflow.astream(initial_state, config=config, stream_mode="values"):
-            print(f"📡 WORKFLOW: Node completed for {run_id}, accumulated state has {len(chunk.get('messages', []))} messages")
+            logger.debug("📡 WORKFLOW: Node completed for %s, accumulated state has %s messages", run_id, len(chunk.get('messages', [])))
             
             # Debug: show which agents have completed
             completed_agents = []
             for key in ['lore', 'art', 'vote', 'mint']:
                 if chunk.get(key) is not None:
                     completed_agents.append(key)
-            print(f"📡 WORKFLOW: Completed agents: {completed_agents}")
-            print(f"📡 WORKFLOW: All chunk keys: {list(chunk.keys())}")
+            logger.debug("📡 WORKFLOW: Completed agents: %s", completed_agents)
+            logger.debug("📡 WORKFLOW: All chunk keys: %s", list(chunk.keys()))
             if chunk.get('prepared_tx'):
-                print(f"📡 WORKFLOW: PreparedTx in chunk: {chunk.get('prepared_tx')}")
+                logger.debug("📡 WORKFLOW: PreparedTx in chunk: %s", chunk.get('prepared_tx'))
             else:
-                print(f"📡 WORKFLOW: No prepared_tx in chunk")
+                logger.debug("📡 WORKFLOW: No prepared_tx in chunk")
             
             # Debug specific vote completion
             if 'vote' in completed_agents:
-                print(f"📡 WORKFLOW: Vote agent completed, checking state...")
-                print(f"📡 WORKFLOW: Vote data in chunk: {chunk.get('vote')}")
-                print(f"📡 WORKFLOW: Checkpoint in chunk: {chunk.get('checkpoint')}")
+                logger.debug("📡 WORKFLOW: Vote agent completed, checking state...")
+                logger.debug("📡 WORKFLOW: Vote data in chunk: %s", chunk.get('vote'))
+                logger.debug("📡 WORKFLOW: Checkpoint in chunk: %s", chunk.get('checkpoint'))
                 if not chunk.get('prepared_tx'):
-                    print(f"🚨 WORKFLOW: Vote completed but prepared_tx is MISSING from chunk!")
+                    logger.error("🚨 WORKFLOW: Vote completed but prepared_tx is MISSING from chunk!")
             
             # Show messages in this accumulated state
-            if chunk.get('messages'):
-                print(f"📡 WORKFLOW: Messages in accumulated state:")
+            if chunk.get('messages') and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("📡 WORKFLOW: Messages in accumulated state:")
                 for i, msg in enumerate(chunk['messages']):
-                    print(f"  Message {i}: {msg.get('agent', '?')} - {msg.get('message', '')[:50]}...")
+                    logger.debug("  Message %s: %s - %s...", i, msg.get('agent', '?'), msg.get('message', '')[:50])
             
             # Update state immediately with accumulated state for real-time streaming
             simple_state.update_run_state(run_id, chunk)
-            print(f"📡 WORKFLOW: Updated state for {run_id} with {len(chunk.get('messages', []))} messages")
+            logger.debug("📡 WORKFLOW: Updated state for %s with %s messages", run_id, len(chunk.get('messages', [])))
         
-        print(f"Workflow {run_id} streaming completed successfully")
+        logger.info("Workflow %s streaming completed successfully", run_id)
         
     except Exception as e:
-        print(f"Workflow {run_id} error: {e}")
-        import traceback
-        print(f"Full traceback: {traceback.format_exc()}")
+        logger.exception("Workflow %s error: %s", run_id, e)
         
         # Store error state
         error_state = dict(initial_state)
@@ -213,14 +245,14 @@ async def stream_run(run_id: str, last_message_index: int = 0):
     
     async def event_generator() -> AsyncGenerator[str, None]:
         try:
-            print(f"Starting SSE stream for run {run_id}")
+            logger.info("Starting SSE stream for run %s", run_id)
             
             # Check if run exists
             current_state = simple_state.get_run_state(run_id)
             if not current_state:
                 error_data = {"run_id": run_id, "error": f"Run {run_id} not found"}
                 yield f"event: error\n"
-                yield f"data: {json.dumps(error_data)}\n\n"
+                yield f"data: {_dumps(error_data)}\n\n"
                 return
             
             # If workflow is already complete (mint present AND no active checkpoint), send only unseen messages, then completion
@@ -229,16 +261,16 @@ async def stream_run(run_id: str, last_message_index: int = 0):
             has_active_checkpoint = current_state.get("checkpoint") is not None
             
             if has_mint and not has_error and not has_active_checkpoint:
-                print(f"Run {run_id} already completed, sending messages from index {last_message_index} then completion event")
+                logger.info("Run %s already completed, sending messages from index %s then completion event", run_id, last_message_index)
                 
                 # Send only unseen agent messages
                 messages = current_state.get("messages", [])
                 unseen_messages = messages[last_message_index:] if last_message_index < len(messages) else []
-                print(f"Sending {len(unseen_messages)} unseen messages out of {len(messages)} total")
+                logger.debug("Sending %s unseen messages out of %s total", len(unseen_messages), len(messages))
                 
                 for message in unseen_messages:
                     yield f"event: update\n"
-                    yield f"data: {json.dumps(message)}\n\n"
+                    yield f"data: {_dumps(message)}\n\n"
                     await asyncio.sleep(0.1)  # Small delay for better UX
                 
                 # Send final state update
@@ -251,90 +283,97 @@ async def stream_run(run_id: str, last_message_index: int = 0):
                     }
                 }
                 yield f"event: state\n"
-                yield f"data: {json.dumps(state_update)}\n\n"
+                yield f"data: {_dumps(state_update)}\n\n"
                 await asyncio.sleep(0.1)
                 
                 # Send completion event
                 completion_data = {"run_id": run_id, "status": "completed"}
                 yield f"event: complete\n"
-                yield f"data: {json.dumps(completion_data)}\n\n"
+                yield f"data: {_dumps(completion_data)}\n\n"
                 return
             
             # If workflow has error, send only unseen messages, then error
             if current_state.get("error"):
-                print(f"Run {run_id} has error, sending messages from index {last_message_index} then error event")
+                logger.info("Run %s has error, sending messages from index %s then error event", run_id, last_message_index)
                 
                 # Send only unseen messages that were generated before error
                 messages = current_state.get("messages", [])
                 unseen_messages = messages[last_message_index:] if last_message_index < len(messages) else []
-                print(f"Sending {len(unseen_messages)} unseen messages out of {len(messages)} total before error")
+                logger.debug("Sending %s unseen messages out of %s total before error", len(unseen_messages), len(messages))
                 
                 for message in unseen_messages:
                     yield f"event: update\n"
-                    yield f"data: {json.dumps(message)}\n\n"
+                    yield f"data: {_dumps(message)}\n\n"
                     await asyncio.sleep(0.1)
                 
                 # Send error event
                 error_data = {"run_id": run_id, "error": current_state["error"]}
                 yield f"event: error\n"
-                yield f"data: {json.dumps(error_data)}\n\n"
+                yield f"data: {_dumps(error_data)}\n\n"
                 return
             elif has_mint and has_active_checkpoint:
-                print(f"📍 SSE: Run {run_id} has mint but active checkpoint '{current_state.get('checkpoint')}' - starting live stream for checkpoint")
+                logger.info("📍 SSE: Run %s has mint but active checkpoint '%s' - starting live stream for checkpoint", run_id, current_state.get('checkpoint'))
             
-            print(f"Starting live stream monitoring for run {run_id}, resuming from message index {last_message_index}")
+            logger.debug("Starting live stream monitoring for run %s, resuming from message index %s", run_id, last_message_index)
             last_message_count = last_message_index  # Resume from where client left off
-            last_state = {}
+            last_fingerprints = {
+                key: _fingerprint(None)
+                for key in ["lore", "art", "vote", "mint", "prepared_tx", "error", "checkpoint"]
+            }
             
-            # Poll for state changes and stream them
-            for poll_count in range(600):  # 10 minutes max (enough for image generation)
+            # Stream state changes as they are written, for 10 minutes max (enough for image generation)
+            loop = asyncio.get_running_loop()
+            stream_deadline = loop.time() + 600
+            for poll_count in itertools.count():
+                if loop.time() >= stream_deadline:
+                    break
+                
+                # Snapshot the version before reading so a write during this pass still wakes us
+                state_version = simple_state.get_version(run_id)
                 try:
                     current_state = simple_state.get_run_state(run_id)
-                    print(f"SSE Poll #{poll_count} for {run_id}: {len(current_state.get('messages', []))} messages, keys: {list(current_state.keys())}")
+                    logger.debug("SSE Poll #%s for %s: %s messages, keys: %s", poll_count, run_id, len(current_state.get('messages', [])), list(current_state))
                     
                     if not current_state:
-                        print(f"No state found for {run_id}, ending SSE stream")
+                        logger.info("No state found for %s, ending SSE stream", run_id)
                         break
                 except Exception as poll_error:
-                    print(f"Error during SSE poll #{poll_count} for {run_id}: {poll_error}")
+                    logger.warning("Error during SSE poll #%s for %s: %s", poll_count, run_id, poll_error)
                     raise
                 
                 # Check for new messages ONLY - this is the most important check
-                messages = current_state.get("messages", [])
-                current_message_count = len(messages)
+                new_messages = simple_state.get_messages_since(run_id, last_message_count)
                 
-                if current_message_count > last_message_count:
-                    print(f"📡 SSE: New messages detected: {current_message_count} vs {last_message_count}")
+                if new_messages:
+                    logger.debug("📡 SSE: New messages detected: %s vs %s", last_message_count + len(new_messages), last_message_count)
                     try:
                         # Only send the NEW messages, not all messages
-                        new_messages = messages[last_message_count:]
                         for new_message in new_messages:
-                            print(f"📡 SSE: Streaming NEW message: {new_message.get('agent')} - {new_message.get('message', '')[:50]}")
+                            logger.debug("📡 SSE: Streaming NEW message: %s - %.50s", new_message.get('agent'), new_message.get('message', ''))
                             yield f"event: update\n"
-                            yield f"data: {json.dumps(new_message)}\n\n"
+                            yield f"data: {_dumps(new_message)}\n\n"
                         
-                        last_message_count = current_message_count
-                        print(f"📡 SSE: Updated last_message_count to {last_message_count}")
+                        # Count what was actually sent; appends can land between snapshots
+                        last_message_count += len(new_messages)
+                        logger.debug("📡 SSE: Updated last_message_count to %s", last_message_count)
                     except Exception as stream_error:
-                        print(f"Error streaming messages for {run_id}: {stream_error}")
+                        logger.warning("Error streaming messages for %s: %s", run_id, stream_error)
                         raise
                 
                 # Check for ACTUAL state changes in non-message fields
                 # Use deep comparison for the important state keys
-                state_changed = False
-                changed_keys = []
-                
-                for key in ["lore", "art", "vote", "mint", "prepared_tx", "error", "checkpoint"]:
-                    current_value = current_state.get(key)
-                    last_value = last_state.get(key)
-                    
-                    # Deep comparison for these state keys
-                    if json.dumps(current_value, sort_keys=True, default=str) != json.dumps(last_value, sort_keys=True, default=str):
-                        state_changed = True
-                        changed_keys.append(key)
+                current_fingerprints = {
+                    key: _fingerprint(current_state.get(key))
+                    for key in ["lore", "art", "vote", "mint", "prepared_tx", "error", "checkpoint"]
+                }
+                changed_keys = [
+                    key for key, fingerprint in current_fingerprints.items()
+                    if fingerprint != last_fingerprints[key]
+                ]
+                state_changed = bool(changed_keys)
                 
                 if state_changed:
-                    print(f"📡 SSE: ACTUAL state change detected for {run_id}: {changed_keys}")
+                    logger.debug("📡 SSE: ACTUAL state change detected for %s: %s", run_id, changed_keys)
                     try:
                         # Send state update
                         state_update = {
@@ -346,22 +385,17 @@ async def stream_run(run_id: str, last_message_index: int = 0):
                             }
                         }
                         yield f"event: state\n"
-                        yield f"data: {json.dumps(state_update)}\n\n"
-                        print(f"📡 SSE: Successfully sent state update for {run_id}")
+                        yield f"data: {_dumps(state_update)}\n\n"
+                        logger.debug("📡 SSE: Successfully sent state update for %s", run_id)
                         
-                        # Update last_state with deep copy of non-message fields
-                        last_state = {
-                            key: current_state.get(key)
-                            for key in ["lore", "art", "vote", "mint", "prepared_tx", "error", "checkpoint"]
-                            if current_state.get(key) is not None
-                        }
+                        # Remember what was sent so the next poll only compares serialized forms
+                        last_fingerprints = current_fingerprints
                         
                     except Exception as state_error:
-                        print(f"Error sending state update for {run_id}: {state_error}")
+                        logger.warning("Error sending state update for %s: %s", run_id, state_error)
                         raise
                 else:
-                    if poll_count % 500 == 0:  # Log every 500 polls (~5s) to reduce noise
-                        print(f"📡 SSE: No state changes detected for {run_id} (poll #{poll_count})")
+                    logger.debug("📡 SSE: No state changes detected for %s (poll #%s)", run_id, poll_count)
                 
                 # Check if workflow is complete (has mint AND no active checkpoint)
                 has_mint = current_state.get("mint") is not None
@@ -369,37 +403,38 @@ async def stream_run(run_id: str, last_message_index: int = 0):
                 has_active_checkpoint = current_state.get("checkpoint") is not None
                 
                 if has_mint and not has_error and not has_active_checkpoint:
-                    print(f"Workflow {run_id} completed (mint present, no error, no active checkpoint), ending SSE stream")
+                    logger.info("Workflow %s completed (mint present, no error, no active checkpoint), ending SSE stream", run_id)
                     try:
                         completion_data = {"run_id": run_id, "status": "completed"}
                         yield f"event: complete\n"
-                        yield f"data: {json.dumps(completion_data)}\n\n"
-                        print(f"Successfully sent completion event for {run_id}")
+                        yield f"data: {_dumps(completion_data)}\n\n"
+                        logger.info("Successfully sent completion event for %s", run_id)
                         break
                     except Exception as completion_error:
-                        print(f"Error sending completion event for {run_id}: {completion_error}")
+                        logger.warning("Error sending completion event for %s: %s", run_id, completion_error)
                         raise
                 elif has_mint and has_active_checkpoint:
-                    print(f"📍 SSE: Workflow has mint but active checkpoint '{current_state.get('checkpoint')}' - keeping stream alive")
+                    logger.info("📍 SSE: Workflow has mint but active checkpoint '%s' - keeping stream alive", current_state.get('checkpoint'))
                 
                 # Check for errors
                 if current_state.get("error"):
-                    print(f"Workflow {run_id} has error, ending SSE stream")
+                    logger.error("Workflow %s has error, ending SSE stream", run_id)
                     error_data = {"run_id": run_id, "error": current_state["error"]}
                     yield f"event: error\n"
-                    yield f"data: {json.dumps(error_data)}\n\n"
+                    yield f"data: {_dumps(error_data)}\n\n"
                     break
                 
-                await asyncio.sleep(1)  # Poll every second
+                # Wake on the next state write; the timeout keeps a 1s poll as a fallback
+                await simple_state.wait_for_update(run_id, state_version, timeout=1.0)
             
             # If we exit the poll loop without completion/error
-            print(f"SSE polling loop ended for {run_id} (max iterations reached or other reason)")
+            logger.info("SSE polling loop ended for %s (max iterations reached or other reason)", run_id)
                 
         except Exception as e:
-            print(f"Stream error for {run_id}: {e}")
+            logger.error("Stream error for %s: %s", run_id, e)
             error_data = {"run_id": run_id, "error": str(e)}
             yield f"event: error\n"
-            yield f"data: {json.dumps(error_data)}\n\n"
+            yield f"data: {_dumps(error_data)}\n\n"
     
     return StreamingResponse(
         event_generator(),
@@ -455,16 +490,16 @@ async def resume_run(run_id: str, request: ResumeRunRequest):
                 # Prepare confirmation message
                 if vote_id:
                     message_text = f"🗳️ Vote created successfully! Vote ID: {vote_id[:10]}...{vote_id[-6:]} | Tx: {tx_hash[:10]}...{tx_hash[-6:]}"
-                    print(f"🎯 VOTE: Transaction confirmed with real vote ID: {vote_id}")
+                    logger.info("🎯 VOTE: Transaction confirmed with real vote ID: %s", vote_id)
                 else:
                     message_text = f"🗳️ Vote transaction confirmed - {tx_hash[:10]}...{tx_hash[-6:]} (no vote ID extracted)"
-                    print(f"⚠️ VOTE: Transaction confirmed but no vote ID extracted: {tx_hash}")
+                    logger.warning("⚠️ VOTE: Transaction confirmed but no vote ID extracted: %s", tx_hash)
                 
                 confirmation_message = {
                     "agent": "Vote",
                     "level": "success",
                     "message": message_text,
-                    "ts": str(uuid.uuid4()),
+                    "ts": simple_state.new_message_ts(),
                     "links": [{"label": "View Transaction", "href": f"https://explorer.shape.network/tx/{tx_hash}"}]
                 }
                 current_state.setdefault("messages", []).append(confirmation_message)
@@ -475,13 +510,13 @@ async def resume_run(run_id: str, request: ResumeRunRequest):
                     if vote_id:
                         # ✅ CRITICAL: Replace the fake vote ID with the real one from blockchain
                         current_state["vote"]["id"] = vote_id
-                        print(f"🔄 VOTE: Updated vote state with real vote ID: {vote_id}")
+                        logger.info("🔄 VOTE: Updated vote state with real vote ID: %s", vote_id)
                     else:
-                        print(f"⚠️ VOTE: No vote ID provided, keeping existing ID: {current_state['vote'].get('id', 'unknown')}")
+                        logger.warning("⚠️ VOTE: No vote ID provided, keeping existing ID: %s", current_state['vote'].get('id', 'unknown'))
                 
                 # Clear checkpoint to continue to tally_vote_agent
                 current_state["checkpoint"] = None
-                print(f"🗳️ VOTE: Transaction confirmed, resuming to tally agent")
+                logger.info("🗳️ VOTE: Transaction confirmed, resuming to tally agent")
             else:
                 raise HTTPException(status_code=400, detail="Invalid decision for vote_tx_approval. Expected 'confirm'.")
         
@@ -498,15 +533,15 @@ async def resume_run(run_id: str, request: ResumeRunRequest):
                     "agent": "Mint",
                     "level": "success",
                     "message": f"🔐 Vote closed successfully! TX: {tx_hash[:10]}...{tx_hash[-6:]} - Ready for final minting step.",
-                    "ts": str(uuid.uuid4()),
+                    "ts": simple_state.new_message_ts(),
                     "links": [{"label": "View Transaction", "href": f"https://explorer.shape.network/tx/{tx_hash}"}]
                 }
                 current_state.setdefault("messages", []).append(confirmation_message)
                 
                 # Now prepare for the mint transaction (stored in mint_tx from the mint agent)
                 mint_tx_data = current_state.get("mint_tx", {})
-                print(f"🔍 DEBUG: mint_tx_data = {mint_tx_data}")
-                print(f"🔍 DEBUG: current_state keys = {list(current_state.keys())}")
+                logger.debug("🔍 DEBUG: mint_tx_data = %s", mint_tx_data)
+                logger.debug("🔍 DEBUG: current_state keys = %s", list(current_state.keys()))
                 if mint_tx_data:
                     # Update the prepared_tx to be the mint transaction
                     current_state["prepared_tx"] = mint_tx_data
@@ -517,7 +552,7 @@ async def resume_run(run_id: str, request: ResumeRunRequest):
                         "agent": "Mint",
                         "level": "info",
                         "message": f"🎯 Vote closed successfully! Now ready for final minting step.",
-                        "ts": str(uuid.uuid4()),
+                        "ts": simple_state.new_message_ts(),
                         "links": [
                             {"label": "View Close Vote TX", "href": f"https://explorer.shape.network/tx/{tx_hash}"},
                             {"label": "Metadata Preview", "href": current_state.get("metadata", {}).get("image", "")}
@@ -525,13 +560,13 @@ async def resume_run(run_id: str, request: ResumeRunRequest):
                     }
                     current_state.setdefault("messages", []).append(mint_ready_message)
                     
-                    print(f"🪙 CLOSE VOTE: Vote closed, checkpoint set to finalize_mint")
-                    print(f"🪙 CLOSE VOTE: Mint tx available - to: {mint_tx_data.get('to', 'unknown')}, gas: {mint_tx_data.get('gas', 'unknown')}")
+                    logger.info("🪙 CLOSE VOTE: Vote closed, checkpoint set to finalize_mint")
+                    logger.info("🪙 CLOSE VOTE: Mint tx available - to: %s, gas: %s", mint_tx_data.get('to', 'unknown'), mint_tx_data.get('gas', 'unknown'))
                 else:
                     # Clear checkpoint to complete workflow if no mint tx
                     current_state["checkpoint"] = None
-                    print(f"🪙 CLOSE VOTE: Vote closed, no mint transaction available")
-                    print(f"🪙 CLOSE VOTE: Available state keys: {list(current_state.keys())}")
+                    logger.info("🪙 CLOSE VOTE: Vote closed, no mint transaction available")
+                    logger.info("🪙 CLOSE VOTE: Available state keys: %s", list(current_state.keys()))
             else:
                 raise HTTPException(status_code=400, detail="Invalid decision for close_vote. Expected 'close'.")
                 
@@ -547,16 +582,16 @@ async def resume_run(run_id: str, request: ResumeRunRequest):
                 # Prepare confirmation message
                 if token_id:
                     message_text = f"🪙 NFT minted successfully! Token ID: {token_id} | TX: {tx_hash[:10]}...{tx_hash[-6:]}"
-                    print(f"🎉 MINT: NFT minted with token ID: {token_id}")
+                    logger.info("🎉 MINT: NFT minted with token ID: %s", token_id)
                 else:
                     message_text = f"🪙 NFT transaction confirmed - {tx_hash[:10]}...{tx_hash[-6:]} (token ID will be available shortly)"
-                    print(f"⚠️ MINT: Transaction confirmed but token ID not extracted: {tx_hash}")
+                    logger.warning("⚠️ MINT: Transaction confirmed but token ID not extracted: %s", tx_hash)
                 
                 completion_message = {
                     "agent": "Mint",
                     "level": "success",
                     "message": message_text,
-                    "ts": str(uuid.uuid4()),
+                    "ts": simple_state.new_message_ts(),
                     "links": [
                         {"label": "View Transaction", "href": f"https://explorer.shape.network/tx/{tx_hash}"},
                         {"label": "Metadata", "href": current_state.get("mint", {}).get("token_uri", "")}
@@ -569,13 +604,13 @@ async def resume_run(run_id: str, request: ResumeRunRequest):
                     current_state["mint"]["tx_hash"] = tx_hash
                     if token_id:
                         current_state["mint"]["token_id"] = token_id
-                        print(f"🪙 MINT: Updated mint receipt with token ID: {token_id}")
+                        logger.info("🪙 MINT: Updated mint receipt with token ID: %s", token_id)
                     else:
-                        print(f"⚠️ MINT: No token ID provided, keeping existing or empty")
+                        logger.warning("⚠️ MINT: No token ID provided, keeping existing or empty")
                 
                 # Clear checkpoint to complete workflow
                 current_state["checkpoint"] = None
-                print(f"🪙 MINT: Transaction confirmed, workflow complete")
+                logger.info("🪙 MINT: Transaction confirmed, workflow complete")
             else:
                 raise HTTPException(status_code=400, detail="Invalid decision for finalize_mint. Expected 'finalize'.")
         
@@ -584,7 +619,7 @@ async def resume_run(run_id: str, request: ResumeRunRequest):
         
         # ✅ CRITICAL FIX for finalize_mint checkpoint: Force workflow to stay active
         if current_state.get("checkpoint") == "finalize_mint":
-            print(f"🛠️ CRITICAL: finalize_mint checkpoint detected - workflow must stay active for second transaction")
+            logger.info("🛠️ CRITICAL: finalize_mint checkpoint detected - workflow must stay active for second transaction")
             # Don't resume workflow - let SSE polling detect the new checkpoint state
             return {"message": "Close vote confirmed, ready for mint", "status": "awaiting_finalize_mint", "checkpoint": "finalize_mint"}
         
@@ -596,22 +631,22 @@ async def resume_run(run_id: str, request: ResumeRunRequest):
         try:
             langgraph_state = await workflow.aget_state(config)
             if langgraph_state and langgraph_state.values:
-                print(f"🔄 SYNC: Updating LangGraph state with corrected vote data")
+                logger.info("🔄 SYNC: Updating LangGraph state with corrected vote data")
                 
                 # Update LangGraph state with corrected vote data from simple_state
                 updated_values = langgraph_state.values.copy()
                 if "vote" in updated_values and "vote" in current_state:
                     updated_values["vote"] = current_state["vote"]
-                    print(f"🔄 SYNC: Updated LangGraph vote state with real ID: {current_state['vote'].get('id', 'unknown')}")
+                    logger.info("🔄 SYNC: Updated LangGraph vote state with real ID: %s", current_state['vote'].get('id', 'unknown'))
                 
                 # Update the LangGraph checkpointer with corrected state
                 await workflow.aupdate_state(config, updated_values)
-                print(f"🔄 SYNC: LangGraph state synchronized successfully")
+                logger.info("🔄 SYNC: LangGraph state synchronized successfully")
             else:
-                print(f"⚠️ SYNC: Could not get LangGraph state for synchronization")
+                logger.warning("⚠️ SYNC: Could not get LangGraph state for synchronization")
                 
         except Exception as sync_error:
-            print(f"❌ SYNC: Failed to synchronize LangGraph state: {sync_error}")
+            logger.error("❌ SYNC: Failed to synchronize LangGraph state: %s", sync_error)
         
         # Resume the workflow execution in the background  
         import asyncio
@@ -626,20 +661,17 @@ async def resume_run(run_id: str, request: ResumeRunRequest):
 async def regenerate_lore_with_feedback(run_id: str, current_state: Dict[str, Any], edit_instructions: str):
     """Regenerate lore with user feedback incorporated"""
     try:
-        print(f"🔄 Regenerating lore for {run_id} with user feedback: {edit_instructions[:50]}...")
+        logger.info("🔄 Regenerating lore for %s with user feedback: %s...", run_id, edit_instructions[:50])
         
         # Add a message showing the regeneration is starting
         feedback_message = {
             "agent": "System",
             "level": "info",
             "message": f"Incorporating user feedback: {edit_instructions}",
-            "ts": str(uuid.uuid4())
+            "ts": simple_state.new_message_ts()
         }
         
-        current_messages = current_state.get("messages", [])
-        current_messages.append(feedback_message)
-        current_state["messages"] = current_messages
-        simple_state.update_run_state(run_id, current_state)
+        simple_state.append_message(run_id, feedback_message)
         
         # Import the lore agent
         from agents.lore import lore_agent
@@ -650,88 +682,75 @@ async def regenerate_lore_with_feedback(run_id: str, current_state: Dict[str, An
         enhanced_state["regenerating"] = True
         
         # Call lore agent with the enhanced state
-        print(f"🔄 Calling lore agent with edit instructions for {run_id}")
+        logger.info("🔄 Calling lore agent with edit instructions for %s", run_id)
         result = await lore_agent(enhanced_state)
         
         # Update the state with the new lore
         if "lore" in result:
-            current_state["lore"] = result["lore"]
-            print(f"🔄 Updated lore for {run_id}")
-        
-        # Add the new messages from the regeneration
-        if "messages" in result:
-            current_messages.extend(result["messages"])
-            current_state["messages"] = current_messages
+            simple_state.update_run_state(run_id, {"lore": result["lore"]})
+            logger.info("🔄 Updated lore for %s", run_id)
         
         # Add a completion message
         completion_message = {
             "agent": "System", 
             "level": "success",
             "message": "Lore regenerated based on your feedback",
-            "ts": str(uuid.uuid4())
+            "ts": simple_state.new_message_ts()
         }
-        current_messages.append(completion_message)
-        current_state["messages"] = current_messages
         
-        # Update state in storage
-        simple_state.update_run_state(run_id, current_state)
-        print(f"🔄 Lore regeneration completed for {run_id}")
+        # Append the regeneration's messages and the completion message in one write
+        simple_state.append_messages(run_id, result.get("messages", []) + [completion_message])
+        logger.info("🔄 Lore regeneration completed for %s", run_id)
         
     except Exception as e:
-        print(f"🔄 Lore regeneration failed for {run_id}: {e}")
+        logger.error("🔄 Lore regeneration failed for %s: %s", run_id, e)
         # Add error message
         error_message = {
             "agent": "System",
             "level": "error", 
             "message": f"Failed to regenerate lore: {str(e)}",
-            "ts": str(uuid.uuid4())
+            "ts": simple_state.new_message_ts()
         }
-        current_messages = current_state.get("messages", [])
-        current_messages.append(error_message)
-        current_state["messages"] = current_messages
-        simple_state.update_run_state(run_id, current_state)
+        simple_state.append_message(run_id, error_message)
 
 
 async def continue_workflow_after_resume(run_id: str, config: Dict[str, Any]):
     """Continue workflow execution after resume - NO input to continue from checkpoint"""
     try:
         workflow = workflows["main"]
-        print(f"🔄 Resuming workflow for {run_id} from checkpoint (no input)")
+        logger.info("🔄 Resuming workflow for %s from checkpoint (no input)", run_id)
         
         # Continue streaming from checkpoint - NO INPUT so it resumes from where it left off
         async for chunk in workflow.astream(None, config=config, stream_mode="values"):
-            print(f"📡 WORKFLOW RESUME: Node completed for {run_id}, accumulated state has {len(chunk.get('messages', []))} messages")
+            logger.debug("📡 WORKFLOW RESUME: Node completed for %s, accumulated state has %s messages", run_id, len(chunk.get('messages', [])))
             
             # Debug resume chunk contents
             completed_agents = []
             for key in ['lore', 'art', 'vote', 'mint']:
                 if chunk.get(key) is not None:
                     completed_agents.append(key)
-            print(f"📡 WORKFLOW RESUME: Completed agents: {completed_agents}")
-            print(f"📡 WORKFLOW RESUME: All chunk keys: {list(chunk.keys())}")
+            logger.debug("📡 WORKFLOW RESUME: Completed agents: %s", completed_agents)
+            logger.debug("📡 WORKFLOW RESUME: All chunk keys: %s", list(chunk.keys()))
             if chunk.get('prepared_tx'):
-                print(f"📡 WORKFLOW RESUME: PreparedTx in chunk: {chunk.get('prepared_tx')}")
+                logger.debug("📡 WORKFLOW RESUME: PreparedTx in chunk: %s", chunk.get('prepared_tx'))
             else:
-                print(f"📡 WORKFLOW RESUME: No prepared_tx in chunk")
+                logger.debug("📡 WORKFLOW RESUME: No prepared_tx in chunk")
                 
             if 'vote' in completed_agents and not chunk.get('prepared_tx'):
-                print(f"🚨 WORKFLOW RESUME: Vote completed but prepared_tx is MISSING from chunk!")
+                logger.error("🚨 WORKFLOW RESUME: Vote completed but prepared_tx is MISSING from chunk!")
             
             # Update state immediately with accumulated state for real-time streaming
             simple_state.update_run_state(run_id, chunk)
-            print(f"📡 WORKFLOW RESUME: Updated state for {run_id} with {len(chunk.get('messages', []))} messages")
+            logger.debug("📡 WORKFLOW RESUME: Updated state for %s with %s messages", run_id, len(chunk.get('messages', [])))
         
-        print(f"Workflow {run_id} resumed and completed successfully")
+        logger.info("Workflow %s resumed and completed successfully", run_id)
         
     except Exception as e:
-        print(f"Workflow {run_id} resume error: {e}")
-        import traceback
-        print(f"Full traceback: {traceback.format_exc()}")
+        logger.exception("Workflow %s resume error: %s", run_id, e)
         
-        # Store error state
-        current_state = simple_state.get_run_state(run_id) or {}
-        current_state["error"] = str(e)
-        simple_state.update_run_state(run_id, current_state)
+        # Store error state in place (writing the whole state back would re-merge every message)
+        with simple_state.run_lock(run_id) as run_state:
+            run_state["error"] = str(e)
 
 
 @app.get("/health")
@@ -0,0 +1,32 @@
+"""
+Helpers for building and streaming agent messages.
+"""
+from typing import Dict, List, Optional
+
+from state import AgentMessage
+import simple_state
+
+
+def agent_message(agent: str, level: str, message: str, **extra) -> AgentMessage:
+    """Build an agent message for the SSE stream, stamped with a fresh ts."""
+    return {"agent": agent, "level": level, "message": message, "ts": simple_state.new_message_ts(), **extra}
+
+
+def numbered_links(label: str, hrefs: List[str]) -> List[Dict[str, str]]:
+    """Link each href under a numbered label, e.g. numbered_links("Option {}", cids)."""
+    return [{"label": label.format(i), "href": href} for i, href in enumerate(hrefs, 1)]
+
+
+def stream_progress(run_id: Optional[str], all_messages: List[AgentMessage], message: AgentMessage) -> None:
+    """
+    Queue an agent's progress message for the run's stream.
+    
+    Messages go through simple_state.message_buffer, so bursts land as batched store
+    writes; the agent flushes the buffer before returning. Streamed messages are not
+    also returned to the workflow, so the run holds one copy; without a run the
+    message is kept in all_messages for the node's return.
+    """
+    if run_id:
+        simple_state.message_buffer.append(run_id, message)
+    else:
+        all_messages.append(message)
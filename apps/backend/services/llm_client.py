@@ -4,6 +4,7 @@ Supports chat completions and structured outputs for Lore Agent research
 """
 import os
 import logging
+import functools
 from typing import Dict, Any, List, Optional, Union, Type
 from dataclasses import dataclass, asdict
 import json
@@ -52,6 +53,19 @@ class LLMAPIError(LLMClientError):
     pass
 
 
+@functools.lru_cache(maxsize=None)
+def _json_schema_instructions(response_model: Type[BaseModel]) -> str:
+    """Build (once per model) the system prompt suffix describing the JSON schema to follow"""
+    schema = response_model.model_json_schema()
+    return f"""
+You must respond with valid JSON that matches this exact schema:
+
+{json.dumps(schema, indent=2)}
+
+Respond only with the JSON object, no additional text or explanation.
+"""
+
+
 class LLMClient:
     """
     OpenAI client for language model interactions
@@ -184,8 +198,9 @@ class LLMClient:
         model: Optional[str] = None,
         max_tokens: Optional[int] = None,
         temperature: Optional[float] = None,
-        system_prompt: Optional[str] = None
-    ) -> tuple[BaseModel, LLMResponse]:
+        system_prompt: Optional[str] = None,
+        as_dict: bool = False
+    ) -> tuple[Union[BaseModel, Dict[str, Any]], LLMResponse]:
         """
         Generate structured completion with Pydantic model validation
         
@@ -196,19 +211,13 @@ class LLMClient:
             max_tokens: Max tokens (overrides default)
             temperature: Temperature (overrides default)
             system_prompt: System prompt to prepend
+            as_dict: Return the parsed JSON dict without building the model (caller validates)
             
         Returns:
-            Tuple of (parsed_model, raw_response)
+            Tuple of (parsed_model, raw_response), or (parsed_dict, raw_response) with as_dict
         """
         # Add JSON schema instructions to system prompt
-        schema = response_model.model_json_schema()
-        json_instructions = f"""
-You must respond with valid JSON that matches this exact schema:
-
-{json.dumps(schema, indent=2)}
-
-Respond only with the JSON object, no additional text or explanation.
-"""
+        json_instructions = _json_schema_instructions(response_model)
         
         full_system_prompt = system_prompt + "\n\n" + json_instructions if system_prompt else json_instructions
         
@@ -249,6 +258,12 @@ Respond only with the JSON object, no additional text or explanation.
             # Parse JSON
             parsed_json = json.loads(json_content)
             
+            if as_dict:
+                if not isinstance(parsed_json, dict):
+                    raise LLMAPIError(f"Expected a JSON object for {response_model.__name__}")
+                logger.info(f"Structured completion parsed for {response_model.__name__}")
+                return parsed_json, response
+            
             # Validate with Pydantic model
             structured_data = response_model.model_validate(parsed_json)
             
@@ -263,16 +278,22 @@ Respond only with the JSON object, no additional text or explanation.
             logger.error(f"Model validation error: {e}")
             raise LLMAPIError(f"Failed to validate structured output: {e}")
     
-    async def generate_lore_pack(self, date_label: str, edit_instructions: Optional[str] = None) -> tuple[LorePack, LLMResponse]:
+    async def generate_lore_pack(
+        self,
+        date_label: str,
+        edit_instructions: Optional[str] = None,
+        as_dict: bool = False
+    ) -> tuple[Union[LorePack, Dict[str, Any]], LLMResponse]:
         """
         Generate a LorePack for historical research (specialized method for Lore Agent)
         
         Args:
             date_label: Historical date to research
             edit_instructions: Optional user feedback for regeneration
+            as_dict: Return the parsed dict instead of a LorePack model
             
         Returns:
-            Tuple of (LorePack, raw_response)
+            Tuple of (LorePack, raw_response), or (dict, raw_response) with as_dict
         """
         system_prompt = """
 You are a historical research agent for an NFT creation platform. Research the given historical date and provide detailed historical context.
@@ -323,9 +344,22 @@ Respond ONLY with the JSON object, no additional text before or after.
             messages=messages,
             response_model=LorePack,
             system_prompt=system_prompt,
-            temperature=0.8  # Slightly higher for creative content
+            temperature=0.8,  # Slightly higher for creative content
+            as_dict=as_dict
         )
     
+    async def generate_lore_pack_dict(self, date_label: str, edit_instructions: Optional[str] = None) -> tuple[Dict[str, Any], LLMResponse]:
+        """
+        Generate lore research as a plain dict, skipping the LorePack model round-trip
+        
+        The Lore Agent stores lore as a dict and validates it with validate_lore_pack,
+        so building a model only to dump it straight back is wasted work.
+        
+        Returns:
+            Tuple of (lore pack dict, raw_response)
+        """
+        return await self.generate_lore_pack(date_label, edit_instructions, as_dict=True)
+    
     def sync_chat_completion(
         self,
         messages: List[Union[LLMMessage, Dict[str, str]]],
@@ -3,8 +3,11 @@ MCP Client - HTTP client for communicating with the MCP server
 Provides methods for all MCP endpoints with error handling and retries
 """
 import os
+import functools
 import json
 import logging
+import time
+from datetime import datetime
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 import httpx
@@ -13,6 +16,25 @@ from urllib.parse import urljoin
 
 logger = logging.getLogger(__name__)
 
+try:
+    # HTTP/2 support for httpx; lets concurrent MCP calls multiplex over one TLS connection
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Keep idle MCP connections around between agent steps so runs skip the TCP/TLS handshake
+MCP_CONNECTION_LIMITS = httpx.Limits(max_keepalive_connections=32, keepalive_expiry=60.0)
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_ends_at(ends_at: Any) -> float:
+    """Parse a vote end time once; polls of the same vote repeat the same value."""
+    if isinstance(ends_at, str):
+        # Handle ISO 8601 format: "2025-08-24T18:00:58.000Z"
+        return datetime.fromisoformat(ends_at.replace('Z', '+00:00')).timestamp()
+    return float(int(ends_at))
+
 
 @dataclass
 class ChainInfo:
@@ -70,6 +92,15 @@ class VoteStatus:
     open: bool
     tallies: List[int]
     ends_at: str
+    
+    def ends_at_timestamp(self) -> float:
+        """
+        Unix timestamp of ends_at (ISO 8601 string or integer timestamp)
+        
+        Raises:
+            ValueError, TypeError: If ends_at is in neither format
+        """
+        return _parse_ends_at(self.ends_at)
 
 
 @dataclass
@@ -124,8 +155,45 @@ class MCPClient:
         # Remove trailing slash for consistent URL joining
         self.base_url = self.base_url.rstrip("/")
         
+        # Pooled HTTP client, so back-to-back and concurrent calls reuse keep-alive connections
+        # instead of paying a new TCP (and TLS) handshake each; bound to the loop that created it
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        
         logger.info(f"Initialized MCP client with base URL: {self.base_url}")
     
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client, creating one for the running event loop if needed"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._discard_client()
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout, limits=MCP_CONNECTION_LIMITS, http2=HTTP2_AVAILABLE
+            )
+            self._client_loop = loop
+        return self._client
+    
+    def _discard_client(self) -> None:
+        """Release a client bound to another event loop before it is replaced"""
+        client, client_loop = self._client, self._client_loop
+        self._client = None
+        self._client_loop = None
+        if client is None or client.is_closed:
+            return
+        if client_loop is not None and client_loop.is_running():
+            # Its connections belong to that loop, so close it there
+            asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+        else:
+            # The loop is gone or stopped; its transports went with it, so just drop the client
+            logger.debug("Dropping MCP HTTP client from a stopped event loop")
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+    
     async def _make_request(
         self,
         method: str,
@@ -157,34 +225,34 @@ class MCPClient:
         
         for attempt in range(self.max_retries + 1):
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    logger.debug(f"Making {method} request to {url} (attempt {attempt + 1})")
-                    
-                    response = await client.request(
-                        method=method,
-                        url=url,
-                        params=params,
-                        json=json_data,
-                        content=data,
-                        headers=headers
+                client = self._get_client()
+                logger.debug(f"Making {method} request to {url} (attempt {attempt + 1})")
+                
+                response = await client.request(
+                    method=method,
+                    url=url,
+                    params=params,
+                    json=json_data,
+                    content=data,
+                    headers=headers
+                )
+                
+                # Check for HTTP errors
+                if response.status_code >= 500:
+                    raise MCPServerError(
+                        f"Server error {response.status_code}: {response.text}"
                     )
+                elif response.status_code >= 400:
+                    raise MCPClientError(
+                        f"Client error {response.status_code}: {response.text}"
+                    )
+                
+                # Parse JSON response
+                try:
+                    return response.json()
+                except json.JSONDecodeError as e:
+                    raise MCPServerError(f"Invalid JSON response: {e}")
                     
-                    # Check for HTTP errors
-                    if response.status_code >= 500:
-                        raise MCPServerError(
-                            f"Server error {response.status_code}: {response.text}"
-                        )
-                    elif response.status_code >= 400:
-                        raise MCPClientError(
-                            f"Client error {response.status_code}: {response.text}"
-                        )
-                    
-                    # Parse JSON response
-                    try:
-                        return response.json()
-                    except json.JSONDecodeError as e:
-                        raise MCPServerError(f"Invalid JSON response: {e}")
-                        
             except httpx.RequestError as e:
                 logger.warning(f"Request error on attempt {attempt + 1}: {e}")
                 if attempt == self.max_retries:
@@ -341,6 +409,55 @@ class MCPClient:
             ends_at=response["endsAt"]
         )
     
+    async def wait_for_vote_change(
+        self,
+        vote_id: str,
+        last_status: Optional[VoteStatus] = None,
+        timeout: float = 30.0,
+        min_interval: float = 0.5,
+        max_interval: float = 5.0
+    ) -> VoteStatus:
+        """
+        Wait until a vote closes, expires or its tallies differ from last_status
+        
+        The MCP server has no long-poll or subscription route for votes, so this polls
+        vote_status adaptively: fast at first, backing off while nothing changes, and
+        waking just after ends_at. Callers get one await per change either way.
+        
+        Args:
+            vote_id: Vote ID to watch
+            last_status: Status the caller already has (None returns the current status)
+            timeout: Seconds to wait for a change before returning the latest status
+            min_interval: First delay between polls in seconds
+            max_interval: Longest delay between polls in seconds
+            
+        Returns:
+            Latest VoteStatus (unchanged from last_status on timeout)
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        interval = min_interval
+        
+        while True:
+            status = await self.get_vote_status(vote_id)
+            if last_status is None or not status.open or status.tallies != last_status.tallies:
+                return status
+            
+            delay = min(interval, deadline - loop.time())
+            try:
+                until_end = status.ends_at_timestamp() - time.time()
+                if until_end <= 0:
+                    return status
+                delay = min(delay, until_end + 0.05)
+            except (ValueError, TypeError):
+                # Unparseable ends_at: rely on the open flag alone
+                pass
+            
+            if delay <= 0:
+                return status
+            await asyncio.sleep(delay)
+            interval = min(interval * 2, max_interval)
+    
     async def tally_vote(self, vote_id: str) -> TallyResult:
         """
         Get vote tallies and determine winner
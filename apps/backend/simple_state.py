@@ -1,15 +1,67 @@
 """
 Simplified state management for testing without checkpointer
 """
-from typing import Dict, Any
-import json
+from typing import Dict, Any, Iterator, List, Tuple
+from collections import deque
+from contextlib import contextmanager
+import asyncio
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 # In-memory storage for run states
 run_states: Dict[str, Dict[str, Any]] = {}
 
+# Agents emit from worker threads (e.g. concurrent image generation) while the
+# workflow loop merges node output, so writes are serialized through this lock
+_lock = threading.RLock()
+
+# Per-run change counters and pending SSE waiters, so streams wake on writes instead of polling
+_versions: Dict[str, int] = {}
+_waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+
+def _notify(run_id: str):
+    """Bump the run's version and wake its waiters (caller holds _lock)"""
+    _versions[run_id] = _versions.get(run_id, 0) + 1
+    for loop, event in _waiters.pop(run_id, []):
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # Waiter's event loop already closed
+            pass
+
+# Per-run message "ts" sets used to dedupe workflow merges: (messages list, messages covered, ts set),
+# extended incrementally so each merge costs O(new messages) rather than rescanning the whole run
+_seen_ts: Dict[str, Tuple[List[Dict[str, Any]], int, set]] = {}
+
+def _seen_timestamps(run_id: str, messages: List[Dict[str, Any]]) -> set:
+    """Get the ts values of a run's messages, catching up on appends since the last merge (caller holds _lock)"""
+    cached = _seen_ts.get(run_id)
+    if cached is not None and cached[0] is messages and cached[1] <= len(messages):
+        _, covered, seen = cached
+    else:
+        # First merge for this run, or its messages list was replaced
+        covered, seen = 0, set()
+    seen.update(msg.get("ts") for msg in messages[covered:])
+    _seen_ts[run_id] = (messages, len(messages), seen)
+    return seen
+
+# Message ids: wall-clock ns keeps them unique across restarts (runs resume from checkpoints),
+# the counter keeps them unique within the process
+_message_seq = itertools.count()
+
+def new_message_ts() -> str:
+    """Get a unique, roughly time-ordered id for an agent message's "ts" field"""
+    return f"{time.time_ns()}-{next(_message_seq)}"
+
 def store_run_state(run_id: str, state: Dict[str, Any]):
     """Store run state in memory"""
-    run_states[run_id] = state
+    with _lock:
+        run_states[run_id] = state
+        _notify(run_id)
 
 def get_run_state(run_id: str) -> Dict[str, Any]:
     """Get run state from memory"""
@@ -17,33 +69,147 @@ def get_run_state(run_id: str) -> Dict[str, Any]:
 
 def update_run_state(run_id: str, updates: Dict[str, Any]):
     """Update run state with new data, properly merging messages"""
-    if run_id not in run_states:
-        run_states[run_id] = {}
+    with _lock:
+        if run_id not in run_states:
+            run_states[run_id] = {}
     
-    current_state = run_states[run_id]
+        current_state = run_states[run_id]
     
-    # Special handling for messages - we want to accumulate them, not replace them
-    if "messages" in updates:
-        current_messages = current_state.get("messages", [])
-        new_messages = updates.get("messages", [])
+        # Special handling for messages - we want to accumulate them, not replace them
+        if "messages" in updates:
+            current_messages = current_state.setdefault("messages", [])
+            new_messages = updates.get("messages", [])
         
-        print(f"📦 STATE: Merging messages for {run_id}: current={len(current_messages)}, new={len(new_messages)}")
+            logger.debug("📦 STATE: Merging messages for %s: current=%s, new=%s", run_id, len(current_messages), len(new_messages))
         
-        # If updates has messages, merge them with existing ones
-        if new_messages:
-            # Merge messages, avoiding duplicates based on timestamp
-            existing_timestamps = {msg.get("ts") for msg in current_messages}
-            for new_msg in new_messages:
-                if new_msg.get("ts") not in existing_timestamps:
-                    current_messages.append(new_msg)
+            # If updates has messages, merge them with existing ones
+            if new_messages:
+                # Merge messages, avoiding duplicates based on timestamp
+                existing_timestamps = _seen_timestamps(run_id, current_messages)
+                for new_msg in new_messages:
+                    if new_msg.get("ts") not in existing_timestamps:
+                        current_messages.append(new_msg)
             
-            print(f"📦 STATE: After merge: {len(current_messages)} total messages")
+                logger.debug("📦 STATE: After merge: %s total messages", len(current_messages))
         
-        # Make a copy of updates to avoid modifying the original
-        updates = updates.copy()
-        updates["messages"] = current_messages
+            # Make a copy of updates to avoid modifying the original
+            updates = updates.copy()
+            updates["messages"] = current_messages
+    
+        run_states[run_id].update(updates)
+        _notify(run_id)
+
+def append_message(run_id: str, message: Dict[str, Any]) -> int:
+    """Append a single message to a run in place, returning the new message count"""
+    with _lock:
+        messages = run_states.setdefault(run_id, {}).setdefault("messages", [])
+        messages.append(message)
+        _notify(run_id)
+        return len(messages)
+
+def append_messages(run_id: str, new_messages: List[Dict[str, Any]]) -> int:
+    """Append a batch of messages in place with a single notification, returning the new message count"""
+    with _lock:
+        messages = run_states.setdefault(run_id, {}).setdefault("messages", [])
+        messages.extend(new_messages)
+        _notify(run_id)
+        return len(messages)
+
+@contextmanager
+def run_lock(run_id: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield a run's live state dict under the store lock, notifying streams once on exit.
+    
+    For read-modify-write changes without copying the state or racing other writers;
+    the lock is a thread lock, so don't await inside the block.
+    """
+    with _lock:
+        state = run_states.setdefault(run_id, {})
+        try:
+            yield state
+        finally:
+            _notify(run_id)
+
+# Longest a buffered agent message waits before reaching the store (and the SSE stream)
+MESSAGE_FLUSH_INTERVAL = 0.1
+
+class MessageBuffer:
+    """
+    Coalesce agent messages per run into one append_messages write per flush interval.
+    
+    Every write wakes each SSE stream for the run, so bursts of agent events
+    (e.g. several images finishing together) are queued and written at once.
+    The first append for a run schedules its flush with loop.call_later; call
+    it from the event loop, and flush() explicitly before handing control back
+    to the workflow so buffered messages land ahead of the node's output.
+    """
+    
+    def __init__(self, interval: float = MESSAGE_FLUSH_INTERVAL):
+        self.interval = interval
+        self._pending: Dict[str, deque] = {}
+        self._handles: Dict[str, asyncio.TimerHandle] = {}
+    
+    def append(self, run_id: str, message: Dict[str, Any]):
+        """Queue a message for the run, scheduling a flush if none is pending"""
+        self._pending.setdefault(run_id, deque()).append(message)
+        if run_id not in self._handles:
+            loop = asyncio.get_running_loop()
+            self._handles[run_id] = loop.call_later(self.interval, self.flush, run_id)
+    
+    def flush(self, run_id: str) -> int:
+        """Write the run's queued messages now in one write, returning how many were written"""
+        handle = self._handles.pop(run_id, None)
+        if handle is not None:
+            handle.cancel()
+        pending = self._pending.pop(run_id, None) or ()
+        if pending:
+            append_messages(run_id, list(pending))
+        return len(pending)
+
+# Shared buffer used by the agents
+message_buffer = MessageBuffer()
+
+def get_messages_since(run_id: str, index: int) -> List[Dict[str, Any]]:
+    """
+    Get the run's messages from index on, without taking the lock.
+    
+    A run's message list is append-only and mutated in place (append_message,
+    append_messages and update_run_state all extend the same list), and list
+    append and slicing are each atomic under the GIL. A reader therefore always
+    sees a consistent prefix plus whatever was fully appended before its slice,
+    the same guarantee a linked list with an atomic tail gives, while the SSE
+    stream keeps plain index-based resumption.
+    """
+    messages = run_states.get(run_id, {}).get("messages")
+    return messages[index:] if messages else []
+
+def get_version(run_id: str) -> int:
+    """Get the run's change counter, bumped on every write"""
+    return _versions.get(run_id, 0)
+
+async def wait_for_update(run_id: str, version: int, timeout: float) -> bool:
+    """Wait until the run changes past version; returns False on timeout"""
+    loop = asyncio.get_running_loop()
+    event = asyncio.Event()
+    waiter = (loop, event)
+    with _lock:
+        if _versions.get(run_id, 0) != version:
+            return True
+        _waiters.setdefault(run_id, []).append(waiter)
     
-    run_states[run_id].update(updates)
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        with _lock:
+            pending = _waiters.get(run_id)
+            if pending and waiter in pending:
+                pending.remove(waiter)
+                if not pending:
+                    # Don't keep an empty list around for every run ever streamed
+                    del _waiters[run_id]
 
 def list_runs() -> Dict[str, Dict[str, Any]]:
     """List all runs"""
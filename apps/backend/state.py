@@ -58,6 +58,21 @@ class PreparedTx(BaseModel):
     gas: Optional[int] = None
 
 
+class AgentMessage(TypedDict, total=False):
+    """
+    One streamed agent message.
+    
+    Kept a plain dict (not a NamedTuple) on purpose: the workflow's operator.add
+    reducer, simple_state's ts dedupe, the SQLite checkpointer and the SSE wire
+    format all consume messages as JSON-shaped dicts.
+    """
+    agent: str  # "Lore" | "Artist" | "Vote" | "Mint" | "System"
+    level: str  # "info" | "success" | "warning" | "error"
+    message: str
+    ts: str  # opaque unique id from simple_state.new_message_ts(), not a parseable timestamp
+    links: List[Dict[str, str]]  # optional {"label", "href"} pairs
+
+
 # Main orchestrator state - using TypedDict for LangGraph compatibility
 class RunState(TypedDict):
     run_id: str
@@ -72,4 +87,4 @@ class RunState(TypedDict):
     checkpoint: Optional[str]
     error: Optional[str]
     # Messages for streaming updates
-    messages: Annotated[List[Dict[str, Any]], operator.add]
+    messages: Annotated[List[AgentMessage], operator.add]
@@ -0,0 +1,255 @@
+"""
+Unit tests for the Artist agent's caches and IPFS pinning
+Tests art-set replay, the semantic seed cache, and bundled Pinata uploads
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+import simple_state
+from agents import artist, mint, vote
+from services.mcp_client import PreparedTx
+
+
+LORE = {
+    "prompt_seed": {
+        "style": "woodcut",
+        "palette": "sepia",
+        "motifs": ["printing press", "movable type"],
+        "negative": "neon"
+    }
+}
+
+ART_SET = {
+    "cids": ["ipfs://art1", "ipfs://art2"],
+    "thumbnails": ["ipfs://thumb1", "ipfs://thumb2"],
+    "style_notes": ["note 1", "note 2"]
+}
+
+
+class TestArtistCaches:
+    """Test cached ArtSets are reused instead of generating new images"""
+
+    def setup_method(self):
+        """Reset the module-level caches and store between tests"""
+        artist._art_set_cache.clear()
+        artist._semantic_cache.clear()
+        simple_state.run_states.clear()
+        simple_state._versions.clear()
+        simple_state._waiters.clear()
+
+    def _state(self, date_label="1450"):
+        return {"run_id": "run-art", "date_label": date_label, "lore": LORE}
+
+    def test_art_set_cache_returns_copies(self):
+        """Test cached ArtSets come back equal but unshared"""
+        prompts = artist.create_image_prompts(LORE["prompt_seed"], "1450")
+        assert artist.get_cached_art_set(prompts) is None
+
+        artist.cache_art_set(prompts, ART_SET)
+        cached = artist.get_cached_art_set(prompts)
+        assert cached == ART_SET
+        cached["cids"].append("ipfs://other")
+        assert artist.get_cached_art_set(prompts) == ART_SET
+
+    @pytest.mark.asyncio
+    async def test_exact_prompt_replay_skips_generation(self):
+        """Test an exact replay returns the cached ArtSet without generating images"""
+        artist.cache_art_set(artist.create_image_prompts(LORE["prompt_seed"], "1450"), ART_SET)
+
+        with patch.object(artist, "generate_image_openai_real", new=AsyncMock()) as generate:
+            result = await artist.artist_agent(self._state())
+
+        generate.assert_not_called()
+        assert result["art"] == ART_SET
+        assert "already generated" in result["messages"][-1]["message"]
+
+    @pytest.mark.asyncio
+    async def test_semantic_cache_hit(self, monkeypatch):
+        """Test a near-identical seed reuses the ArtSet of the seed it resembles"""
+        monkeypatch.setenv("ARTIST_SEMANTIC_CACHE", "true")
+        artist.remember_seed("earlier seed", (1.0, 0.0), ART_SET)
+
+        with patch.object(artist, "embed_seed_text", new=AsyncMock(return_value=(0.96, 0.28))), \
+                patch.object(artist, "generate_image_openai_real", new=AsyncMock()) as generate:
+            result = await artist.artist_agent(self._state())
+
+        generate.assert_not_called()
+        assert result["art"] == ART_SET
+        assert "near-identical seed (similarity 0.96)" in result["messages"][-1]["message"]
+
+    def test_semantic_cache_miss(self):
+        """Test seeds below the similarity threshold find nothing"""
+        artist.remember_seed("earlier seed", (1.0, 0.0), ART_SET)
+
+        assert artist.find_similar_art_set((0.0, 1.0)) is None
+        assert artist.find_similar_art_set((0.8, 0.6)) is None
+        assert artist.find_similar_art_set((1.0, 0.0)) == (1.0, ART_SET)
+
+    def test_semantic_cache_threshold_env(self, monkeypatch):
+        """Test a malformed threshold falls back to the default instead of failing"""
+        monkeypatch.setenv("ARTIST_SEMANTIC_CACHE_THRESHOLD", "0.85")
+        assert artist._semantic_cache_threshold() == 0.85
+
+        monkeypatch.setenv("ARTIST_SEMANTIC_CACHE_THRESHOLD", "high")
+        assert artist._semantic_cache_threshold() == artist.DEFAULT_SEMANTIC_CACHE_THRESHOLD
+
+
+def _pinata_response(url, files, headers, timeout):
+    """Fake Pinata reply naming the directory CID after the uploaded directory"""
+    directory = files[0][1][0].split("/")[0]
+    return Mock(status_code=200, json=Mock(return_value={"IpfsHash": f"bafy-{directory}"}))
+
+
+class TestArtBundlePinning:
+    """Test image + thumbnail bundles and how their path CIDs flow downstream"""
+
+    def setup_method(self):
+        """Reset the pin and art caches and the store between tests"""
+        artist._pin_cache.clear()
+        artist._art_set_cache.clear()
+        simple_state.run_states.clear()
+        simple_state._versions.clear()
+        simple_state._waiters.clear()
+
+    @pytest.fixture
+    def pinata(self, monkeypatch):
+        """Pinata session whose POSTs are recorded instead of sent"""
+        monkeypatch.setenv("PINATA_JWT", "test-jwt")
+        session = Mock()
+        session.post.side_effect = _pinata_response
+        monkeypatch.setattr(artist, "_get_pinata_session", lambda: session)
+        return session
+
+    def test_bundle_is_one_multipart_request(self, pinata, tmp_path):
+        """Test image and thumbnail go up together under one directory and come back as paths"""
+        paths = artist.pin_art_bundle_sync(tmp_path / "art_1.png", (b"png", "image/png"), b"jpeg", "run-1")
+
+        assert paths == ("bafy-run-1_art_1/art_1.png", "bafy-run-1_art_1/thumb_art_1.jpg")
+        pinata.post.assert_called_once()
+        url, = pinata.post.call_args.args
+        assert url == artist.PINATA_PIN_FILE_URL
+        assert pinata.post.call_args.kwargs["files"] == [
+            ("file", ("run-1_art_1/art_1.png", b"png", "image/png")),
+            ("file", ("run-1_art_1/thumb_art_1.jpg", b"jpeg", "image/jpeg")),
+        ]
+        assert pinata.post.call_args.kwargs["headers"] == {"Authorization": "Bearer test-jwt"}
+
+    def test_bundle_reads_the_current_jwt(self, pinata, tmp_path, monkeypatch):
+        """Test each upload is authorized with PINATA_JWT as it is now, not as it was on first use"""
+        artist.pin_art_bundle_sync(tmp_path / "art_1.png", (b"png", "image/png"), b"jpeg", "run-1")
+        monkeypatch.setenv("PINATA_JWT", "rotated-jwt")
+        artist.pin_art_bundle_sync(tmp_path / "art_2.png", (b"png2", "image/png"), b"jpeg2", "run-1")
+
+        assert pinata.post.call_args.kwargs["headers"] == {"Authorization": "Bearer rotated-jwt"}
+
+    def test_pinata_session_per_thread(self):
+        """Test each worker thread gets its own Pinata session, reused across its calls"""
+        session = artist._get_pinata_session()
+        assert artist._get_pinata_session() is session
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            other = pool.submit(artist._get_pinata_session).result()
+        assert other is not session
+
+    def test_bundle_pinata_error(self, pinata, tmp_path):
+        """Test a failed upload reports no paths"""
+        pinata.post.side_effect = None
+        pinata.post.return_value = Mock(status_code=500, text="boom")
+
+        assert artist.pin_art_bundle_sync(tmp_path / "art_1.png", (b"png", "image/png"), b"jpeg", "run-1") is None
+
+    def test_bundle_cache_hit_skips_upload(self, pinata, tmp_path):
+        """Test identical bytes reuse the earlier pin's paths without another POST"""
+        first = artist.pin_art_bundle_sync(tmp_path / "art_1.png", (b"png", "image/png"), b"jpeg", "run-1")
+        again = artist.pin_art_bundle_sync(tmp_path / "art_1.png", (b"png", "image/png"), b"jpeg", "run-2")
+        assert again == first
+        assert pinata.post.call_count == 1
+
+        # A different thumbnail is different content
+        artist.pin_art_bundle_sync(tmp_path / "art_1.png", (b"png", "image/png"), b"other", "run-2")
+        assert pinata.post.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_realistic_directory_cids_survive_into_messages(self, pinata):
+        """Test real-looking Qm…/bafy… directory CIDs keep their file path in the ArtSet and completion messages"""
+        directory_cids = {
+            "run-art_art_1": "QmYwAPJzv5CZsnA625s3Xf2nemtYgPpHdWEz79ojWnPbdG",
+            "run-art_art_2": "bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi",
+        }
+        pinata.post.side_effect = lambda url, files, headers, timeout: Mock(
+            status_code=200, json=Mock(return_value={"IpfsHash": directory_cids[files[0][1][0].split("/")[0]]})
+        )
+        with patch.object(artist, "generate_image_openai_real", new=AsyncMock(side_effect=lambda prompt, filename: artist.generate_image_openai(prompt, size="256x256"))):
+            result = await artist.artist_agent({"run_id": "run-art", "date_label": "1450", "lore": LORE})
+
+        expected = [
+            "ipfs://QmYwAPJzv5CZsnA625s3Xf2nemtYgPpHdWEz79ojWnPbdG/art_1.png",
+            "ipfs://bafybeigdyrzt5sfp7udm7hu76uh7y26nf3efuylqabf3oclgtqy55fbzdi/art_2.png",
+        ]
+        assert result["art"]["cids"] == expected
+
+        # Progress is streamed to the run and not returned again; only the summary goes back to the workflow
+        streamed = simple_state.get_run_state("run-art").get("messages", [])
+        assert [msg["message"] for msg in result["messages"]] == ["🎨 All images complete! Generated 2/2 artworks ready for voting"]
+        assert not {msg["ts"] for msg in streamed} & {msg["ts"] for msg in result["messages"]}
+
+        # The frontend previews what its IPFS pattern captures from the message text, so the file path must be part of it
+        completions = [msg["message"] for msg in streamed if msg["message"].startswith("Image ")]
+        ipfs_pattern = re.compile(r"ipfs://([A-Za-z0-9]{46,}(?:/[^\s)]+)?)")
+        captured = sorted(match for message in completions for match in ipfs_pattern.findall(message))
+        assert ["ipfs://" + cid for cid in captured] == expected
+
+    @pytest.mark.asyncio
+    async def test_path_cids_flow_to_vote_and_mint(self, pinata):
+        """Test the artist's ipfs://<dir>/<file> CIDs are voted on and minted unchanged"""
+        with patch.object(artist, "generate_image_openai_real", new=AsyncMock(side_effect=lambda prompt, filename: artist.generate_image_openai(prompt, size="256x256"))):
+            result = await artist.artist_agent({"run_id": "run-art", "date_label": "1450", "lore": LORE})
+
+        art = result["art"]
+        assert art["cids"] == ["ipfs://bafy-run-art_art_1/art_1.png", "ipfs://bafy-run-art_art_2/art_2.png"]
+        assert art["thumbnails"] == ["ipfs://bafy-run-art_art_1/thumb_art_1.jpg", "ipfs://bafy-run-art_art_2/thumb_art_2.jpg"]
+
+        # Vote options are the path CIDs as-is
+        mcp_client = Mock()
+        mcp_client.start_vote = AsyncMock(return_value=("0x" + "1" * 64, PreparedTx(to="0xvote", data="0x", gas=600000)))
+        with patch.object(vote, "get_mcp_client", return_value=mcp_client):
+            vote_result = await vote.vote_agent({"run_id": None, "art": art})
+        assert mcp_client.start_vote.call_args.args[0] == art["cids"]
+        assert [link["href"] for link in vote_result["messages"][0]["links"]] == art["cids"]
+
+        # The minted metadata points its gateway image at the file inside the directory
+        winner_cid = art["cids"][1]
+        mcp_client.pin_metadata = AsyncMock(return_value=Mock(cid="ipfs://bafy-metadata"))
+        mcp_client.create_close_vote_transaction = AsyncMock(return_value={"skip_close": True})
+        mcp_client.create_mint_transaction = AsyncMock(return_value=PreparedTx(to="0xmint", data="0x"))
+        mint_state = {
+            "run_id": None,
+            "date_label": "1450",
+            "lore": {"summary_md": "Printing", "sources": [], "prompt_seed": {}},
+            "vote": {"id": vote_result["vote"]["id"], "result": {"winner_cid": winner_cid}},
+            "art": art,
+        }
+        with patch.object(mint, "get_mcp_client", return_value=mcp_client):
+            mint_result = await mint.mint_agent(mint_state)
+
+        assert mint_result["metadata"]["image"] == "https://ipfs.io/ipfs/bafy-run-art_art_2/art_2.png"
+        assert mcp_client.create_mint_transaction.call_args.args[1] == winner_cid
+
+
+class TestProduceOne:
+    """Test one artwork's generate → thumbnail → pin chain"""
+
+    @pytest.mark.asyncio
+    async def test_thumbnail_error_wins_over_compression_error(self, tmp_path):
+        """Test a failed thumbnail is reported even when the concurrent compression also fails"""
+        png_bytes = artist.generate_image_openai("prompt", size="256x256")
+        with patch.object(artist, "generate_image_openai_real", new=AsyncMock(return_value=png_bytes)), \
+                patch.object(artist, "create_thumbnail", side_effect=ValueError("thumbnail")), \
+                patch.object(artist, "_prepare_image_payload", side_effect=RuntimeError("compression")) as prepare:
+            with pytest.raises(ValueError, match="thumbnail"):
+                await artist._produce_one(0, "prompt", tmp_path, "run-1")
+
+        prepare.assert_called_once()
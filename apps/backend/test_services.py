@@ -110,6 +110,50 @@ class TestMCPClient:
             # Should have made max_retries + 1 attempts
             assert mock_request.call_count == 2  # max_retries=1, so 2 total attempts
     
+    @pytest.mark.asyncio
+    async def test_wait_for_vote_change(self):
+        """Test waiting returns once the tallies move, and the latest status on timeout"""
+        from services.mcp_client import VoteStatus
+        
+        ends_at = "2999-01-01T00:00:00.000Z"
+        idle = VoteStatus(open=True, tallies=[0, 0], ends_at=ends_at)
+        voted = VoteStatus(open=True, tallies=[1, 0], ends_at=ends_at)
+        
+        with patch.object(self.client, 'get_vote_status', AsyncMock(side_effect=[idle, idle, voted])) as mock_status:
+            status = await self.client.wait_for_vote_change("0x1", idle, timeout=5.0, min_interval=0.01)
+            assert status == voted
+            assert mock_status.call_count == 3
+        
+        with patch.object(self.client, 'get_vote_status', AsyncMock(return_value=idle)):
+            status = await self.client.wait_for_vote_change("0x1", idle, timeout=0.05, min_interval=0.01)
+            assert status == idle
+    
+    @pytest.mark.asyncio
+    async def test_pooled_client_replaced_across_loops(self):
+        """Test a client left on another running loop is closed there when this loop replaces it"""
+        import threading
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            async def get_client():
+                return self.client._get_client()
+            stale = asyncio.run_coroutine_threadsafe(get_client(), other_loop).result(timeout=5)
+            
+            fresh = self.client._get_client()
+            assert fresh is not stale
+            assert self.client._get_client() is fresh
+            for _ in range(100):
+                if stale.is_closed:
+                    break
+                await asyncio.sleep(0.01)
+            assert stale.is_closed
+        finally:
+            await self.client.aclose()
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join(timeout=5)
+            other_loop.close()
+    
     def test_singleton_get_mcp_client(self):
         """Test singleton pattern for get_mcp_client"""
         client1 = get_mcp_client()
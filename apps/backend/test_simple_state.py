@@ -0,0 +1,145 @@
+"""
+Unit tests for the in-memory run state store
+Tests message appends and SSE change notification
+"""
+import asyncio
+import threading
+import pytest
+
+import simple_state
+
+
+class TestSimpleState:
+    """Test simple_state message handling and update signalling"""
+
+    def setup_method(self):
+        """Reset the module-level store between tests"""
+        simple_state.run_states.clear()
+        simple_state._versions.clear()
+        simple_state._waiters.clear()
+        simple_state._seen_ts.clear()
+
+    def test_append_message_in_place(self):
+        """Test append_message grows the existing list without replacing it"""
+        simple_state.store_run_state("run-1", {"messages": []})
+        messages = simple_state.get_run_state("run-1")["messages"]
+
+        assert simple_state.append_message("run-1", {"agent": "Artist", "ts": "a"}) == 1
+        assert simple_state.append_message("run-1", {"agent": "Artist", "ts": "b"}) == 2
+
+        assert simple_state.get_run_state("run-1")["messages"] is messages
+        assert [msg["ts"] for msg in messages] == ["a", "b"]
+
+    def test_append_message_unknown_run(self):
+        """Test append_message creates state for a run that was never stored"""
+        assert simple_state.append_message("run-2", {"agent": "Lore", "ts": "a"}) == 1
+        assert simple_state.get_run_state("run-2")["messages"][0]["agent"] == "Lore"
+
+    def test_append_messages_batch(self):
+        """Test a batch append keeps order and bumps the version once"""
+        simple_state.append_message("run-8", {"ts": "a"})
+        version = simple_state.get_version("run-8")
+
+        assert simple_state.append_messages("run-8", [{"ts": "b"}, {"ts": "c"}]) == 3
+        assert [msg["ts"] for msg in simple_state.get_run_state("run-8")["messages"]] == ["a", "b", "c"]
+        assert simple_state.get_version("run-8") == version + 1
+
+    def test_update_merges_appended_messages(self):
+        """Test workflow chunks do not duplicate messages already appended"""
+        message = {"agent": "Artist", "ts": "a"}
+        simple_state.append_message("run-3", message)
+        simple_state.update_run_state("run-3", {"messages": [message, {"agent": "Vote", "ts": "b"}]})
+
+        assert len(simple_state.get_run_state("run-3")["messages"]) == 2
+
+    def test_update_dedupes_messages_appended_between_merges(self):
+        """Test merges also skip messages appended after the previous merge"""
+        simple_state.update_run_state("run-13", {"messages": [{"ts": "a"}]})
+        simple_state.append_message("run-13", {"ts": "b"})
+        simple_state.update_run_state("run-13", {"messages": [{"ts": "a"}, {"ts": "b"}, {"ts": "c"}]})
+
+        assert [msg["ts"] for msg in simple_state.get_run_state("run-13")["messages"]] == ["a", "b", "c"]
+
+    def test_writes_bump_version(self):
+        """Test every write path bumps the run version"""
+        assert simple_state.get_version("run-4") == 0
+        simple_state.store_run_state("run-4", {})
+        simple_state.update_run_state("run-4", {"checkpoint": None})
+        simple_state.append_message("run-4", {"ts": "a"})
+        assert simple_state.get_version("run-4") == 3
+
+    @pytest.mark.asyncio
+    async def test_wait_for_update_returns_immediately_when_stale(self):
+        """Test a version already passed does not block"""
+        simple_state.append_message("run-5", {"ts": "a"})
+        assert await simple_state.wait_for_update("run-5", 0, timeout=5.0)
+
+    @pytest.mark.asyncio
+    async def test_wait_for_update_times_out(self):
+        """Test waiting without writes returns False after the timeout"""
+        version = simple_state.get_version("run-6")
+        assert not await simple_state.wait_for_update("run-6", version, timeout=0.05)
+        assert "run-6" not in simple_state._waiters
+
+    @pytest.mark.asyncio
+    async def test_wait_for_update_wakes_on_thread_write(self):
+        """Test a write from a worker thread wakes the waiting stream"""
+        version = simple_state.get_version("run-7")
+        timer = threading.Timer(0.05, simple_state.append_message, args=("run-7", {"ts": "a"}))
+        timer.start()
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert await simple_state.wait_for_update("run-7", version, timeout=5.0)
+        assert loop.time() - started < 1.0
+
+    @pytest.mark.asyncio
+    async def test_message_buffer_coalesces_burst(self):
+        """Test buffered messages land in one write after the flush interval"""
+        buffer = simple_state.MessageBuffer(interval=0.05)
+        buffer.append("run-9", {"ts": "a"})
+        buffer.append("run-9", {"ts": "b"})
+        assert simple_state.get_version("run-9") == 0
+
+        await asyncio.sleep(0.1)
+        assert [msg["ts"] for msg in simple_state.get_run_state("run-9")["messages"]] == ["a", "b"]
+        assert simple_state.get_version("run-9") == 1
+
+    @pytest.mark.asyncio
+    async def test_message_buffer_explicit_flush(self):
+        """Test flush writes immediately and cancels the scheduled flush"""
+        buffer = simple_state.MessageBuffer(interval=0.05)
+        buffer.append("run-10", {"ts": "a"})
+
+        assert buffer.flush("run-10") == 1
+        assert buffer.flush("run-10") == 0
+        await asyncio.sleep(0.1)
+        assert simple_state.get_version("run-10") == 1
+
+    def test_new_message_ts_unique(self):
+        """Test message ids never repeat, so ts-based dedupe keeps every message"""
+        ids = [simple_state.new_message_ts() for _ in range(1000)]
+        assert len(set(ids)) == len(ids)
+
+    def test_get_messages_since(self):
+        """Test readers get only the messages past their index"""
+        assert simple_state.get_messages_since("run-11", 0) == []
+        simple_state.append_messages("run-11", [{"ts": "a"}, {"ts": "b"}, {"ts": "c"}])
+
+        assert [msg["ts"] for msg in simple_state.get_messages_since("run-11", 1)] == ["b", "c"]
+        assert simple_state.get_messages_since("run-11", 3) == []
+
+    def test_run_lock_mutates_in_place(self):
+        """Test run_lock yields the live state and notifies once on exit"""
+        simple_state.append_message("run-14", {"ts": "a"})
+        messages = simple_state.get_run_state("run-14")["messages"]
+        version = simple_state.get_version("run-14")
+
+        with simple_state.run_lock("run-14") as run_state:
+            run_state["error"] = "boom"
+            run_state["messages"].append({"ts": "b"})
+
+        state = simple_state.get_run_state("run-14")
+        assert state["error"] == "boom"
+        assert state["messages"] is messages and len(messages) == 2
+        assert simple_state.get_version("run-14") == version + 1
@@ -255,8 +255,9 @@ export function AgentConsole({ runState, updates, onUpdate }: AgentConsoleProps)
   };
 
   // Helper function to extract IPFS URLs from message text and convert to HTTP gateway URLs
+  // (artworks are pinned in per-image directories, so keep any "/file" path after the CID)
   const extractAndConvertIpfsUrls = (message: string) => {
-    const ipfsRegex = /ipfs:\/\/([A-Za-z0-9]{46,})/g;
+    const ipfsRegex = /ipfs:\/\/([A-Za-z0-9]{46,}(?:\/[^\s)]+)?)/g;
     const matches = Array.from(message.matchAll(ipfsRegex));
     return matches.map(match => ({
       original: match[0],